@@ -0,0 +1,136 @@
+import json
+import shlex
+import sys
+import time
+
+from metrics import is_failure
+from service import OPERATIONS, to_json
+from sinks import EventSink
+
+# Script arguments are text; these parameters are converted before the call
+SCRIPT_ARGUMENTS = {
+    'total_copies': int,
+    'limit': int,
+    'after_seq': int,
+    'isbns': lambda value: value.split(","),
+}
+# Parameter names of the operations that take converted arguments
+PARAMETERS = {
+    'add_book': ('isbn', 'title', 'author', 'genre', 'total_copies'),
+    'borrow_many': ('member_id', 'isbns'),
+    'return_many': ('member_id', 'isbns'),
+    'fuzzy_search_books': ('search_type', 'search_term', 'limit'),
+    'suggest': ('prefix', 'field', 'limit'),
+    'page_books': ('cursor', 'limit'),
+    'page_members': ('cursor', 'limit'),
+    'read_changes': ('after_seq', 'limit'),
+}
+
+
+# ---------------------------
+# Scripted batch mode
+# ---------------------------
+# Runs one command per line without prompts or banners. A line is either a
+# JSON request as sent to the service, {"id": ..., "op": ..., "args": [...]},
+# or a shell-quoted command such as
+#   borrow_book MEM001 978-0735211292
+#   add_book 978-0735211292 "Big Magic" "Elizabeth Gilbert" Non-Fiction 5
+# Blank lines and lines starting with # are skipped. Every command gets one
+# JSON result line {"line", "id", "op", "ok", "result"} plus "error" with the
+# library's message (or the exception) when it fails; a command fails when
+# it raises or returns False or (False, ...).
+
+def parse_command(line):
+    # Returns (request id or None, op, args)
+    if line.startswith("{"):
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("Malformed request: expected an object")
+        return request.get('id'), request.get('op'), list(request.get('args', ()))
+
+    # shlex is slow, so it only handles the lines that quote or escape
+    if '"' in line or "'" in line or "\\" in line:
+        op, *args = shlex.split(line)
+    else:
+        op, *args = line.split()
+    for position, name in enumerate(PARAMETERS.get(op, ())[:len(args)]):
+        convert = SCRIPT_ARGUMENTS.get(name)
+        if convert is not None:
+            args[position] = convert(args[position])
+    return None, op, args
+
+
+class BatchRunner:
+    def __init__(self, library, output=None):
+        self.library = library
+        self.output = output
+        self._errors = []
+        # Takes over the library's sink: nothing is printed, and its error
+        # messages become the "error" of the result
+        library.sink = EventSink(callback=self._collect)
+
+    def _collect(self, event):
+        if event['kind'] == 'error':
+            self._errors.append(event['message'])
+
+    def run_command(self, line_number, line):
+        request_id, op, result = None, None, None
+        self._errors = []
+        try:
+            request_id, op, args = parse_command(line)
+            if op not in OPERATIONS:
+                raise ValueError(f"Unknown operation: {op}")
+            result = getattr(self.library, op)(*args)
+            ok = not is_failure(result)
+        except Exception as e:
+            ok = False
+            self._errors.append(str(e))
+
+        response = {'line': line_number, 'id': request_id, 'op': op, 'ok': ok, 'result': to_json(result)}
+        if not ok:
+            response['error'] = "; ".join(self._errors) or "Operation failed"
+        return response
+
+    def run(self, lines):
+        # Returns {'commands', 'succeeded', 'failed', 'seconds', 'per_second'}
+        output = self.output or sys.stdout
+        succeeded = failed = 0
+        start = time.perf_counter()
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            response = self.run_command(line_number, line)
+            if response['ok']:
+                succeeded += 1
+            else:
+                failed += 1
+            output.write(json.dumps(response, separators=(',', ':')) + "\n")
+        output.flush()
+        seconds = time.perf_counter() - start
+        commands = succeeded + failed
+        return {
+            'commands': commands,
+            'succeeded': succeeded,
+            'failed': failed,
+            'seconds': seconds,
+            'per_second': commands / seconds if seconds else 0.0,
+        }
+
+
+def run_batch(library, source, output=None, summary=None):
+    # source is a path, "-" for stdin or any iterable of lines. The summary
+    # goes to stderr so the results on stdout stay one JSON object per line.
+    runner = BatchRunner(library, output)
+    if source == "-":
+        report = runner.run(sys.stdin)
+    elif isinstance(source, str):
+        with open(source, encoding='utf-8') as f:
+            report = runner.run(f)
+    else:
+        report = runner.run(source)
+
+    print(f"📊 {report['commands']} command(s): {report['succeeded']} succeeded, {report['failed']} failed "
+          f"in {report['seconds']:.3f} s ({report['per_second']:,.0f} commands/s)",
+          file=summary or sys.stderr)
+    return report
@@ -0,0 +1,48 @@
+import gc
+import sys
+import tracemalloc
+
+from records import Book
+
+
+def measure(make_book, count):
+    gc.collect()
+    tracemalloc.start()
+    books = {f"978-{number:09d}": make_book(number) for number in range(count)}
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del books
+    return current
+
+
+def as_dict(number):
+    return {
+        'title': f"Title {number}",
+        'author': f"Author {number % 5000}",
+        'genre': "Fantasy",
+        'total_copies': 3,
+        'available_copies': 3
+    }
+
+
+def as_record(number):
+    return Book(f"Title {number}", f"Author {number % 5000}", "Fantasy", 3, 3)
+
+
+def run_memory_benchmark(count=1_000_000):
+    terminal_width = 60
+    print("=" * terminal_width)
+    print(f"🧠 CATALOG MEMORY AT {count:,} BOOKS 🧠".center(terminal_width))
+    print("=" * terminal_width)
+
+    dict_bytes = measure(as_dict, count)
+    record_bytes = measure(as_record, count)
+
+    print(f"📖 dict books:    {dict_bytes / 2**20:8.1f} MiB ({dict_bytes / count:.0f} B/book)")
+    print(f"📖 slotted books: {record_bytes / 2**20:8.1f} MiB ({record_bytes / count:.0f} B/book)")
+    print(f"🎯 saved {(1 - record_bytes / dict_bytes) * 100:.0f}% of catalog memory")
+    print("=" * terminal_width)
+
+
+if __name__ == "__main__":
+    run_memory_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
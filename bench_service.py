@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import random
+import threading
+import time
+
+from service import LibraryClient, LibraryService
+
+
+def start_background_service(books, members):
+    # Runs the service on its own event loop thread so the load generator
+    # does not share a loop with it.
+    ready = threading.Event()
+    holder = {}
+
+    async def main():
+        service = await LibraryService(port=0).start()
+        for number in range(books):
+            service.library.add_book(f"978-{number:09d}", f"Title {number}", f"Author {number % 500}",
+                                     "Fantasy", 3)
+        for number in range(members):
+            service.library.add_member(f"Member {number}", f"member{number}@email.com")
+        holder['port'] = service.port
+        ready.set()
+        await service.serve_forever()
+
+    threading.Thread(target=lambda: asyncio.run(main()), daemon=True).start()
+    ready.wait()
+    return holder['port']
+
+
+async def run_connection(port, requests, pipeline, books, members, latencies, seed):
+    client = await LibraryClient.connect(port=port)
+    rng = random.Random(seed)
+    in_flight = []
+    for _ in range(requests):
+        member_id = f"MEM{rng.randrange(members) + 1:03d}"
+        isbn = f"978-{rng.randrange(books):09d}"
+        roll = rng.random()
+        if roll < 0.4:
+            op, args = 'search_books', ('title', f"Title {rng.randrange(books)}")
+        elif roll < 0.7:
+            op, args = 'borrow_book', (member_id, isbn)
+        elif roll < 0.9:
+            op, args = 'return_book', (member_id, isbn)
+        else:
+            op, args = 'get_book_details', (isbn,)
+        in_flight.append((time.perf_counter(), client.send(op, *args)))
+
+        if len(in_flight) >= pipeline:
+            await flush_in_flight(in_flight, latencies)
+    await flush_in_flight(in_flight, latencies)
+    await client.close()
+
+
+async def flush_in_flight(in_flight, latencies):
+    for sent, future in in_flight:
+        await future
+        latencies.append(time.perf_counter() - sent)
+    in_flight.clear()
+
+
+async def run_load(port, connections, requests, pipeline, books, members):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_connection(port, requests, pipeline, books, members, latencies, seed)
+                           for seed in range(connections)))
+    elapsed = time.perf_counter() - start
+    return elapsed, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure library service throughput and latency")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per connection")
+    parser.add_argument("--pipeline", type=int, default=16, help="requests in flight per connection")
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--port", type=int, help="use an already running service instead")
+    options = parser.parse_args()
+
+    port = options.port or start_background_service(options.books, options.members)
+    elapsed, latencies = asyncio.run(run_load(port, options.connections, options.requests,
+                                              options.pipeline, options.books, options.members))
+
+    terminal_width = 60
+    total = len(latencies)
+    print("=" * terminal_width)
+    print("📡 LIBRARY SERVICE LOAD TEST 📡".center(terminal_width))
+    print("=" * terminal_width)
+    print(f"🔗 {options.connections} connections x {options.requests} requests, pipeline {options.pipeline}")
+    print(f"🚀 throughput: {total / elapsed:,.0f} requests/s")
+    print(f"⏱️  p50 latency: {latencies[total // 2] * 1000:.2f} ms")
+    print(f"⏱️  p99 latency: {latencies[min(total - 1, int(total * 0.99))] * 1000:.2f} ms")
+    print("=" * terminal_width)
+
+
+if __name__ == "__main__":
+    main()
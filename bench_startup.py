@@ -0,0 +1,68 @@
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks import generate_books, generate_members
+from journal import Journal
+from sinks import NullSink
+
+
+def write_catalog_journal(directory, books, members):
+    # A snapshot of the whole catalog and an empty journal tail
+    journal = Journal(directory, group_commit=10_000, snapshot_every=0)
+    library = journal.load(NullSink())
+    library.import_books(generate_books(books, library.valid_genres), batch_size=10_000)
+    library.import_members(generate_members(members), batch_size=10_000)
+    journal.snapshot()
+    journal.close()
+    # A book and a member for the first borrow after startup
+    return next(iter(library.get_all_books())), library.get_all_members()[0]['member_id']
+
+
+def measure_eager(directory):
+    start = time.perf_counter()
+    with Journal(directory) as journal:
+        journal.load(NullSink())
+        return time.perf_counter() - start
+
+
+def measure_lazy(directory, isbn, member_id):
+    # Seconds until the menu can show, the first borrow is done and
+    # searching is ready
+    start = time.perf_counter()
+    with Journal(directory) as journal:
+        library = journal.load(NullSink(), lazy=True)
+        menu = time.perf_counter() - start
+        library.borrow_book(member_id, isbn)
+        borrow = time.perf_counter() - start
+        library.search_books("title", "storm")
+        search = time.perf_counter() - start
+        library.return_book(member_id, isbn)
+        return menu, borrow, search
+
+
+def run_startup_benchmark(books=1_000_000):
+    terminal_width = 60
+    print("=" * terminal_width)
+    print(f"🚀 STARTUP FROM A SAVED {books:,} BOOK CATALOG 🚀".center(terminal_width))
+    print("=" * terminal_width)
+
+    directory = tempfile.mkdtemp(prefix="library-startup-")
+    try:
+        print("🏗️  Writing the catalog snapshot...")
+        isbn, member_id = write_catalog_journal(directory, books, books // 2)
+
+        eager = measure_eager(directory)
+        menu, borrow, search = measure_lazy(directory, isbn, member_id)
+        print(f"⏳ eager load, menu after:  {eager:8.2f} s")
+        print(f"🚀 lazy load, menu after:   {menu * 1000:8.2f} ms")
+        print(f"📖 lazy load, first borrow: {borrow:8.2f} s")
+        print(f"🔍 lazy load, first search: {search:8.2f} s")
+    finally:
+        shutil.rmtree(directory)
+    print("=" * terminal_width)
+
+
+if __name__ == "__main__":
+    run_startup_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,363 @@
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from operations import LibraryManagementSystem
+from render import Renderer, format_book
+from sinks import NullSink
+from storage import BACKENDS, open_library
+
+# name -> (books, members)
+SIZES = {
+    '10k': (10_000, 1_000),
+    '100k': (100_000, 50_000),
+    '1m': (1_000_000, 500_000),
+}
+
+WORDS = ("Shadow", "River", "Empire", "Garden", "Silent", "Storm", "Crown", "Winter", "Golden",
+         "Machine", "Ocean", "Secret", "Fire", "Glass", "Kingdom", "Night", "Star", "Dream",
+         "Iron", "Forest", "Memory", "Code", "Voyage", "Harbor", "Summer", "Lost", "City")
+FIRST_NAMES = ("Aminata", "Mohamed", "Fatmata", "Ibrahim", "Mariama", "Abdul", "Kadiatu",
+               "John", "Sarah", "Michael", "Emily", "David", "Lisa", "Joshua", "Grace")
+LAST_NAMES = ("Kamara", "Sesay", "Bangura", "Conteh", "Koroma", "Turay", "Jalloh", "Smith",
+              "Johnson", "Chen", "Davis", "Wilson", "Brown", "Taylor", "Garcia")
+
+
+# ---------------------------
+# Synthetic data generators
+# ---------------------------
+
+def generate_books(count, genres, seed=1, start=0):
+    rng = random.Random(seed)
+    for number in range(start, start + count):
+        yield {
+            'isbn': f"978-{number:010d}",
+            'title': " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))) + f" {number}",
+            'author': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'genre': rng.choice(genres),
+            'total_copies': rng.randint(1, 5),
+        }
+
+
+def generate_members(count, seed=2, start=0):
+    rng = random.Random(seed)
+    for number in range(start, start + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield {'name': f"{first} {last}", 'email': f"{first}.{last}.{number}@email.com".lower()}
+
+
+def build_library(books, members, backend="memory", path=":memory:"):
+    # The search cache is off so the search benchmarks time the index itself
+    if backend == "memory":
+        library = LibraryManagementSystem(sink=NullSink(), search_cache_size=0)
+    else:
+        library = open_library(backend, path, NullSink())
+    library.import_books(generate_books(books, library.valid_genres), batch_size=10_000)
+    library.import_members(generate_members(members), batch_size=10_000)
+    return library
+
+
+# ---------------------------
+# Benchmarks
+# ---------------------------
+# Each benchmark prepares its inputs, then returns (operation count, callable)
+# so that only the callable is timed.
+
+def bench_add_book(library, rng, count):
+    rows = list(generate_books(count, library.valid_genres, seed=rng.random(), start=len(library.books) * 10))
+
+    def run():
+        for row in rows:
+            library.add_book(row['isbn'], row['title'], row['author'], row['genre'], row['total_copies'])
+    return count, run
+
+
+def bench_add_member(library, rng, count):
+    rows = list(generate_members(count, seed=rng.random(), start=library.next_member_id * 10))
+
+    def run():
+        for row in rows:
+            library.add_member(row['name'], row['email'])
+    return count, run
+
+
+def _search(field, terms, method="search_books"):
+    def bench(library, rng, count):
+        queries = [rng.choice(terms) for _ in range(count)]
+        search = getattr(library, method)
+
+        def run():
+            for term in queries:
+                search(field, term)
+        return count, run
+    return bench
+
+
+bench_search_title = _search("title", [word.lower() for word in WORDS] + ["storm crown", "glass k"])
+bench_search_author = _search("author", [name.lower() for name in FIRST_NAMES + LAST_NAMES] + ["sarah chen"])
+# Misspelt terms, one edit away from real words and names
+bench_fuzzy_title = _search("title", ["shadw", "kingdon", "storm crwn", "golden rivr"], "fuzzy_search_books")
+bench_fuzzy_author = _search("author", ["mohamed kamra", "sarah chenn", "gracee"], "fuzzy_search_books")
+# Common words, whose every gram is shared by a large part of the catalog,
+# so each search spends its whole candidate budget
+bench_fuzzy_common = _search("title", ["shadow", "storm crown", "golden river"], "fuzzy_search_books")
+
+
+def bench_update_book(library, rng, count):
+    isbns = rng.sample(list(library.books), count)
+
+    def run():
+        for isbn in isbns:
+            library.update_book(isbn, "title", f"Revised {isbn}")
+    return count, run
+
+
+def _loan_pairs(library, rng, count):
+    # (member_id, isbn) pairs that will all succeed: members stay within the
+    # limit of 3 loans and never borrow the same book twice.
+    room = {member['member_id']: 3 - len(member['borrowed_books']) for member in library.get_all_members()}
+    members = [member_id for member_id, free in room.items() for _ in range(free)]
+    rng.shuffle(members)
+    available = {isbn: book['available_copies'] for isbn, book in library.books.items()
+                 if book['available_copies'] > 0}
+    isbns = list(available)
+
+    pairs = []
+    taken = set()
+    for member_id in members:
+        if len(pairs) == count or not isbns:
+            break
+        isbn = rng.choice(isbns)
+        if (member_id, isbn) in taken or isbn in library.get_member_details(member_id)['borrowed_books'] \
+                or not available[isbn]:
+            continue
+        available[isbn] -= 1
+        taken.add((member_id, isbn))
+        pairs.append((member_id, isbn))
+    return pairs
+
+
+def bench_borrow_book(library, rng, count):
+    pairs = _loan_pairs(library, rng, count)
+
+    def run():
+        for member_id, isbn in pairs:
+            library.borrow_book(member_id, isbn)
+    return len(pairs), run
+
+
+def bench_borrow_many(library, rng, count):
+    # Each member's loans from the pairs become one batch
+    batches = {}
+    for member_id, isbn in _loan_pairs(library, rng, count):
+        batches.setdefault(member_id, []).append(isbn)
+
+    def run():
+        for member_id, isbns in batches.items():
+            library.borrow_many(member_id, isbns)
+    return sum(len(isbns) for isbns in batches.values()), run
+
+
+def bench_return_book(library, rng, count):
+    pairs = [(member['member_id'], isbn) for member in library.get_all_members()
+             for isbn in member['borrowed_books']][:count]
+
+    def run():
+        for member_id, isbn in pairs:
+            library.return_book(member_id, isbn)
+    return len(pairs), run
+
+
+def bench_delete_member(library, rng, count):
+    members = [member['member_id'] for member in library.get_all_members() if not member['borrowed_books']]
+    doomed = rng.sample(members, min(count, len(members)))
+
+    def run():
+        for member_id in doomed:
+            library.delete_member(member_id)
+    return len(doomed), run
+
+
+def bench_list_books(library, rng, count):
+    def run():
+        for _ in range(count):
+            for isbn, book in library.get_all_books().items():
+                pass
+    return count, run
+
+
+def bench_list_members(library, rng, count):
+    def run():
+        for _ in range(count):
+            for member in library.get_all_members():
+                pass
+    return count, run
+
+
+def bench_render_books(library, rng, count):
+    # Formats and writes count pages of the catalog listing
+    pages = []
+    cursor = None
+    for _ in range(count):
+        items, cursor = library.page_books(cursor)
+        pages.append(items)
+    renderer = Renderer(io.StringIO())
+
+    def run():
+        for items in pages:
+            renderer.write_records(items, format_book)
+    return count, run
+
+
+# name -> (benchmark, operations per run); borrowing must run before return
+BENCHMARKS = {
+    'add_book': (bench_add_book, 1000),
+    'add_member': (bench_add_member, 1000),
+    'search_books_title': (bench_search_title, 100),
+    'search_books_author': (bench_search_author, 100),
+    'fuzzy_search_title': (bench_fuzzy_title, 20),
+    'fuzzy_search_author': (bench_fuzzy_author, 20),
+    'fuzzy_search_common': (bench_fuzzy_common, 20),
+    'update_book': (bench_update_book, 1000),
+    'borrow_book': (bench_borrow_book, 1000),
+    'borrow_many': (bench_borrow_many, 1000),
+    'return_book': (bench_return_book, 1000),
+    'delete_member': (bench_delete_member, 500),
+    'get_all_books': (bench_list_books, 3),
+    'get_all_members': (bench_list_members, 3),
+    'render_books': (bench_render_books, 100),
+}
+
+# name -> µs/op that must hold at every size, up to 1m books
+TARGETS = {
+    'fuzzy_search_title': 100_000,
+    'fuzzy_search_author': 100_000,
+    'fuzzy_search_common': 100_000,
+}
+
+
+def run_benchmarks(sizes, selected=None, repeat=5, seed=42, backends=("memory",)):
+    # Results are keyed by size for the in-memory backend and by
+    # "size/backend" for the others, e.g. "100k/sqlite"
+    results = {}
+    directory = tempfile.mkdtemp(prefix="library-bench-")
+    try:
+        for size in sizes:
+            for backend in backends:
+                key = size if backend == "memory" else f"{size}/{backend}"
+                path = os.path.join(directory, f"{size}.sqlite3")
+                results[key] = _run_size(key, size, backend, path, selected, repeat, seed)
+    finally:
+        shutil.rmtree(directory)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        'results': results,
+    }
+
+
+def _run_size(key, size, backend, path, selected, repeat, seed):
+    books, members = SIZES[size]
+    print(f"🏗️  Building {key} library ({books:,} books, {members:,} members)...")
+    library = build_library(books, members, backend, path)
+    rng = random.Random(seed)
+    results = {}
+    try:
+        for name, (bench, count) in BENCHMARKS.items():
+            if selected and name not in selected:
+                continue
+            # Keep the fastest of several runs, each with fresh inputs. As
+            # in timeit, the collector is paused while a run is timed.
+            best = None
+            try:
+                for _ in range(repeat):
+                    operations, run = bench(library, rng, count)
+                    gc.collect()
+                    gc.disable()
+                    try:
+                        start = time.perf_counter()
+                        run()
+                        seconds = time.perf_counter() - start
+                    finally:
+                        gc.enable()
+                    if not operations:
+                        continue
+                    us_per_op = seconds / operations * 1e6
+                    if best is None or us_per_op < best['us_per_op']:
+                        best = {'operations': operations, 'seconds': seconds, 'us_per_op': us_per_op}
+            except NotImplementedError:
+                print(f"   {name:<22} {'skipped (not supported)':>24}")
+                continue
+            if best is None:
+                print(f"   {name:<22} {'skipped (nothing to do)':>24}")
+                continue
+            results[name] = best
+            target = TARGETS.get(name)
+            marker = f"  🚫 over the {target / 1000:,.0f} ms target" if target and best['us_per_op'] > target else ""
+            print(f"   {name:<22} {best['us_per_op']:>12.1f} µs/op{marker}")
+    finally:
+        if backend != "memory":
+            library.close()
+    return results
+
+
+def compare(baseline, current, threshold):
+    # Returns the (size, name, baseline µs, current µs) entries that got slower
+    # than baseline by more than threshold (0.2 = 20%).
+    regressions = []
+    for size, benches in current['results'].items():
+        for name, result in benches.items():
+            before = baseline['results'].get(size, {}).get(name)
+            if not before or not before['us_per_op']:
+                continue
+            ratio = result['us_per_op'] / before['us_per_op']
+            marker = "🚫 SLOWER" if ratio > 1 + threshold else "🎯"
+            print(f"   {marker} {size} {name:<22} {before['us_per_op']:>10.1f} → "
+                  f"{result['us_per_op']:>10.1f} µs/op ({ratio:.2f}x)")
+            if ratio > 1 + threshold:
+                regressions.append((size, name, before['us_per_op'], result['us_per_op']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark LibraryManagementSystem operations")
+    parser.add_argument("--sizes", nargs="+", choices=sorted(SIZES), default=["10k"])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["memory"],
+                        help="storage backends to compare; SQLite runs on a temporary database file")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark; the fastest is kept")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the results")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag slowdowns against a saved results file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown before flagging, as a fraction")
+    options = parser.parse_args(argv)
+
+    report = run_benchmarks(options.sizes, options.only, options.repeat, backends=options.backends)
+    with open(options.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {options.output}")
+
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, options.threshold)
+        if regressions:
+            print(f"⚠️  {len(regressions)} benchmark(s) slower than baseline")
+            return 1
+        print("🎉 No slowdowns against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import mmap
+import os
+import struct
+from collections.abc import ItemsView, Mapping
+
+# ---------------------------
+# Binary catalog snapshot
+# ---------------------------
+# Layout (little endian):
+#   header   magic, book count and the offsets of the three sections below
+#   records  one fixed-width record per book, in catalog order; text fields
+#            are (offset, length) references into the string table
+#   index    record numbers sorted by ISBN bytes, for binary search
+#   strings  UTF-8 text; repeated titles, authors and genres are stored once
+
+MAGIC = b"LIBCAT01"
+HEADER = struct.Struct("<8sQQQQ")
+RECORD = struct.Struct("<QIQIQIQIII")
+INDEX_ENTRY = struct.Struct("<I")
+
+
+def write_catalog(books, path):
+    # books is an ISBN -> book dict such as LibraryManagementSystem.get_all_books()
+    strings = bytearray()
+    offsets = {}
+
+    def intern(text, shared=True):
+        data = text.encode('utf-8')
+        if shared and data in offsets:
+            return offsets[data], len(data)
+        offset = len(strings)
+        strings.extend(data)
+        if shared:
+            offsets[data] = offset
+        return offset, len(data)
+
+    records = bytearray()
+    isbns = []
+    for isbn, book in books.items():
+        isbn_ref = intern(isbn, shared=False)
+        isbns.append(isbn.encode('utf-8'))
+        records.extend(RECORD.pack(*isbn_ref, *intern(book['title']), *intern(book['author']),
+                                   *intern(book['genre']), book['total_copies'],
+                                   book['available_copies']))
+
+    index = bytearray()
+    for record_number in sorted(range(len(isbns)), key=isbns.__getitem__):
+        index.extend(INDEX_ENTRY.pack(record_number))
+
+    records_offset = HEADER.size
+    index_offset = records_offset + len(records)
+    strings_offset = index_offset + len(index)
+
+    with open(path + ".tmp", 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(isbns), records_offset, index_offset, strings_offset))
+        f.write(records)
+        f.write(index)
+        f.write(strings)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+class MappedCatalog(Mapping):
+    # Read-only ISBN -> book mapping backed by a memory-mapped catalog file.
+    # Opening only reads the header; records are decoded when accessed.
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self._records, self._index, self._strings = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"Not a catalog file: {path}")
+
+    def _text(self, offset, length):
+        start = self._strings + offset
+        return str(self._map[start:start + length], 'utf-8')
+
+    def _isbn_bytes(self, record_number):
+        offset, length = struct.unpack_from("<QI", self._map, self._records + record_number * RECORD.size)
+        start = self._strings + offset
+        return self._map[start:start + length]
+
+    def _record(self, record_number):
+        (isbn_offset, isbn_length, title_offset, title_length, author_offset, author_length,
+         genre_offset, genre_length, total_copies, available_copies) = RECORD.unpack_from(
+            self._map, self._records + record_number * RECORD.size)
+        return self._text(isbn_offset, isbn_length), {
+            'title': self._text(title_offset, title_length),
+            'author': self._text(author_offset, author_length),
+            'genre': self._text(genre_offset, genre_length),
+            'total_copies': total_copies,
+            'available_copies': available_copies
+        }
+
+    def _find(self, isbn):
+        target = isbn.encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            record_number, = INDEX_ENTRY.unpack_from(self._map, self._index + middle * INDEX_ENTRY.size)
+            candidate = self._isbn_bytes(record_number)
+            if candidate == target:
+                return record_number
+            if candidate < target:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def __getitem__(self, isbn):
+        record_number = self._find(isbn) if isinstance(isbn, str) else None
+        if record_number is None:
+            raise KeyError(isbn)
+        return self._record(record_number)[1]
+
+    def __contains__(self, isbn):
+        return isinstance(isbn, str) and self._find(isbn) is not None
+
+    def __iter__(self):
+        for record_number in range(self._count):
+            yield str(self._isbn_bytes(record_number), 'utf-8')
+
+    def __len__(self):
+        return self._count
+
+    def items(self):
+        return _MappedItems(self)
+
+    def get_book_details(self, isbn):
+        return self.get(isbn)
+
+    def get_all_books(self):
+        return self
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _MappedItems(ItemsView):
+    # Decodes each record once instead of iterating keys and looking them up
+
+    def __iter__(self):
+        catalog = self._mapping
+        for record_number in range(catalog._count):
+            yield catalog._record(record_number)
@@ -0,0 +1,147 @@
+import threading
+import time
+
+# Event type for each library mutation
+EVENT_TYPES = {
+    'add_book': 'book_added',
+    'update_book': 'book_updated',
+    'delete_book': 'book_deleted',
+    'add_member': 'member_added',
+    'update_member': 'member_updated',
+    'delete_member': 'member_deleted',
+    'borrow_book': 'book_borrowed',
+    'return_book': 'book_returned',
+}
+
+
+class ResumeError(ValueError):
+    # The requested position has already been overwritten in the ring
+    # buffer; the consumer has to resynchronize from a full export.
+    pass
+
+
+# ---------------------------
+# Change feed
+# ---------------------------
+# Registered as a mutation listener, the feed numbers every mutation with a
+# sequence number and keeps the latest capacity events in a ring buffer.
+# Events are dicts {'seq', 'type', 'op', 'record', 'time'}. Consumers read
+# everything after the last sequence number they saw, so they can resume
+# after a restart as long as that event is still in the buffer.
+#
+# A consumer that falls more than capacity events behind is handled by the
+# overflow policy: "drop" keeps the library running at full speed and the
+# consumer gets a ResumeError on its next poll; "block" makes the mutating
+# operation wait up to block_timeout seconds for subscribers to catch up,
+# after which the laggards are dropped.
+
+class ChangeFeed:
+    def __init__(self, capacity=10000, overflow="drop", block_timeout=1.0, start_seq=0):
+        if overflow not in ("drop", "block"):
+            raise ValueError("overflow must be 'drop' or 'block'")
+        self.capacity = capacity
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.last_seq = start_seq
+        self._start_seq = start_seq
+        self._ring = [None] * capacity
+        self._subscriptions = set()
+        self._changed = threading.Condition()
+
+    @property
+    def first_seq(self):
+        # Oldest sequence number still in the buffer
+        return max(self.last_seq - self.capacity + 1, self._start_seq + 1)
+
+    def publish(self, op, record):
+        with self._changed:
+            seq = self.last_seq + 1
+            if self.overflow == "block":
+                self._wait_for_room(seq)
+            self._ring[seq % self.capacity] = {
+                'seq': seq,
+                'type': EVENT_TYPES.get(op, op),
+                'op': op,
+                'record': record,
+                'time': time.time(),
+            }
+            self.last_seq = seq
+            self._changed.notify_all()
+
+    def _wait_for_room(self, seq):
+        # Called with the condition held
+        deadline = None
+        while True:
+            lagging = [subscription for subscription in self._subscriptions
+                       if not subscription.overrun and seq - subscription.position > self.capacity]
+            if not lagging:
+                return
+            if deadline is None:
+                deadline = time.monotonic() + self.block_timeout
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                for subscription in lagging:
+                    subscription.overrun = True
+                return
+            self._changed.wait(remaining)
+
+    def read(self, after_seq=0, limit=None):
+        # Events with seq > after_seq, oldest first
+        with self._changed:
+            return self._read(after_seq, limit)
+
+    def _read(self, after_seq, limit):
+        if after_seq > self.last_seq:
+            raise ValueError(f"Sequence {after_seq} is ahead of the feed ({self.last_seq})")
+        if after_seq < self.first_seq - 1:
+            raise ResumeError(f"Events after {after_seq} were dropped; the oldest kept is {self.first_seq}")
+        stop = self.last_seq if limit is None else min(self.last_seq, after_seq + limit)
+        return [self._ring[seq % self.capacity] for seq in range(after_seq + 1, stop + 1)]
+
+    def subscribe(self, after_seq=None):
+        # Starts after after_seq, or at the next event when None
+        with self._changed:
+            position = self.last_seq if after_seq is None else after_seq
+            if position < self.first_seq - 1:
+                raise ResumeError(f"Events after {position} were dropped; the oldest kept is {self.first_seq}")
+            subscription = Subscription(self, position)
+            self._subscriptions.add(subscription)
+            return subscription
+
+
+class Subscription:
+    def __init__(self, feed, position):
+        self.feed = feed
+        self.position = position
+        self.overrun = False
+
+    def poll(self, limit=None, timeout=0):
+        # Returns the next events, waiting up to timeout seconds (None waits
+        # forever) when there are none yet
+        changed = self.feed._changed
+        with changed:
+            if self.overrun:
+                raise ResumeError(f"Subscriber fell behind after event {self.position}")
+            if timeout != 0:
+                changed.wait_for(lambda: self.feed.last_seq > self.position, timeout)
+            try:
+                events = self.feed._read(self.position, limit)
+            except ResumeError:
+                self.overrun = True
+                raise
+            if events:
+                self.position = events[-1]['seq']
+                # Wake publishers waiting for this subscriber to catch up
+                changed.notify_all()
+            return events
+
+    def close(self):
+        with self.feed._changed:
+            self.feed._subscriptions.discard(self)
+            self.feed._changed.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,246 @@
+import json
+import os
+import threading
+import time
+
+from operations import LibraryManagementSystem
+
+SNAPSHOT_PREFIX = "snapshot-"
+SEGMENT_PREFIX = "journal-"
+
+
+# ---------------------------
+# Write-ahead journal with snapshot compaction
+# ---------------------------
+# Every mutation of the attached library is written to the current journal
+# segment as one JSON line as soon as it is appended, so it reaches the OS
+# right away. The fsync is shared by a group: it runs after group_commit
+# records, or at most max_delay seconds after the first unsynced record, on a
+# background flusher thread when no further append comes. Every
+# snapshot_every records the full state
+# is written to a snapshot file, a fresh segment is started and older
+# segments and snapshots are deleted, so recovery only replays the tail.
+# A snapshot first waits for every operation in progress on a concurrent
+# library, so no mutation is in the saved state without being numbered
+# before it; for such a library the snapshots that appends call for are
+# taken on the flusher thread, outside the operation that triggered them.
+
+class Journal:
+    def __init__(self, directory, group_commit=64, max_delay=0.05, snapshot_every=10000):
+        self.directory = directory
+        self.group_commit = group_commit
+        self.max_delay = max_delay
+        self.snapshot_every = snapshot_every
+        self.library = None
+        self._loaded = None
+        self.seq = 0
+        self._unsynced = 0
+        self._unsynced_since = None
+        self._since_snapshot = 0
+        self._snapshot_due = False
+        self._segment = None
+        self._lock = threading.RLock()
+        self._wake = threading.Condition(self._lock)
+        self._flusher = None
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self, sink=None, lazy=False, concurrent=False):
+        # Rebuilds the library from the latest snapshot plus the journal tail
+        # and starts recording its mutations. With lazy=True the library is
+        # returned at once and filled in on a background thread; see
+        # LibraryManagementSystem.from_loader().
+        self._loaded = LibraryManagementSystem.from_loader(self._restore, sink, lazy, concurrent)
+        return self._loaded
+
+    def _restore(self, library):
+        snapshot_seq, state = self._latest_snapshot()
+        if state is not None:
+            library.restore_state(state)
+        self.seq = snapshot_seq
+
+        segments = self._segments()
+        valid_end = 0
+        for position, (start, path) in enumerate(segments):
+            is_last = position == len(segments) - 1
+            records, valid_end = self._read_segment(path, is_last)
+            for record in records:
+                if record['seq'] <= self.seq:
+                    continue
+                library.apply_mutation(record['op'], record['record'])
+                self.seq = record['seq']
+                self._since_snapshot += 1
+
+        if segments:
+            # Drop a record torn by a crash before appending after it
+            path = segments[-1][1]
+            with open(path, 'r+b') as f:
+                f.truncate(valid_end)
+            self._segment = open(path, 'a', encoding='utf-8')
+        else:
+            self._open_segment()
+
+        self.library = library
+        library._journal = self
+        library.add_mutation_listener(self.append)
+        self._flusher = threading.Thread(target=self._flush_in_background, name="journal-flusher", daemon=True)
+        self._flusher.start()
+
+    def append(self, op, record):
+        with self._lock:
+            self.seq += 1
+            self._segment.write(json.dumps({'seq': self.seq, 'op': op, 'record': record},
+                                           separators=(',', ':')) + "\n")
+            self._segment.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.group_commit:
+                self.flush()
+            elif self._unsynced_since is None:
+                self._unsynced_since = time.monotonic()
+                self._wake.notify()
+
+            self._since_snapshot += 1
+            if self.snapshot_every and self._since_snapshot >= self.snapshot_every:
+                if self.library._locks is None:
+                    self.snapshot()
+                elif not self._snapshot_due:
+                    # The calling operation still holds its locks
+                    self._snapshot_due = True
+                    self._wake.notify()
+
+    def flush(self):
+        with self._lock:
+            if not self._unsynced:
+                return
+            os.fsync(self._segment.fileno())
+            self._unsynced = 0
+            self._unsynced_since = None
+
+    def _flush_in_background(self):
+        # Syncs written records max_delay seconds after the first of them,
+        # even when no further append comes, and takes due snapshots
+        while True:
+            with self._wake:
+                if self._segment is None:
+                    return
+                if not self._snapshot_due:
+                    if self._unsynced_since is None:
+                        self._wake.wait()
+                    else:
+                        remaining = self._unsynced_since + self.max_delay - time.monotonic()
+                        if remaining > 0:
+                            self._wake.wait(remaining)
+                        else:
+                            self.flush()
+                    continue
+            # The library's locks are taken before the journal's, as
+            # operations do
+            self.snapshot()
+
+    def snapshot(self):
+        with self.library._exclusive(), self._lock:
+            if self._segment is None:
+                return
+            self.flush()
+            path = os.path.join(self.directory, f"{SNAPSHOT_PREFIX}{self.seq:012d}.json")
+            with open(path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump({'seq': self.seq, 'state': self.library.export_state()}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+
+            self._segment.close()
+            self._open_segment()
+            _fsync_directory(self.directory)
+
+            for start, old_path in self._segments():
+                if start <= self.seq:
+                    os.remove(old_path)
+            for seq, old_path in self._snapshots():
+                if seq < self.seq:
+                    os.remove(old_path)
+            self._since_snapshot = 0
+            self._snapshot_due = False
+
+    def close(self):
+        # A lazy load still restoring would open a segment after this
+        if self._loaded is not None:
+            try:
+                self._loaded.wait_until_loaded("records")
+            except RuntimeError:
+                pass
+        with self._lock:
+            if self._segment is None:
+                return
+            self.flush()
+            self._segment.close()
+            self._segment = None
+            if self.library is not None:
+                self.library.remove_mutation_listener(self.append)
+            self._wake.notify_all()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{self.seq + 1:012d}.log")
+        self._segment = open(path, 'a', encoding='utf-8')
+
+    def _files(self, prefix, suffix):
+        found = []
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith(suffix):
+                number = name[len(prefix):-len(suffix)]
+                if number.isdigit():
+                    found.append((int(number), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def _segments(self):
+        return self._files(SEGMENT_PREFIX, ".log")
+
+    def _snapshots(self):
+        return self._files(SNAPSHOT_PREFIX, ".json")
+
+    def _latest_snapshot(self):
+        snapshots = self._snapshots()
+        if not snapshots:
+            return 0, None
+        with open(snapshots[-1][1], encoding='utf-8') as f:
+            snapshot = json.load(f)
+        return snapshot['seq'], snapshot['state']
+
+    def _read_segment(self, path, is_last):
+        # Returns the complete records and the byte offset just past them.
+        records = []
+        valid_end = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    records.append(json.loads(line))
+                except ValueError:
+                    if is_last:
+                        break
+                    raise ValueError(f"Corrupt journal segment: {path}")
+                valid_end += len(line)
+        return records, valid_end
+
+
+def _fsync_directory(directory):
+    # Makes renames and new files durable; not supported on every platform.
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,117 @@
+import bisect
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds, from 1 µs to 1 s
+BUCKETS = (1e-06, 2.5e-06, 5e-06, 1e-05, 2.5e-05, 5e-05, 0.0001, 0.00025, 0.0005,
+           0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def is_failure(result):
+    # Operations report failure as False, or as (False, []) for searches
+    return result is False or (isinstance(result, tuple) and result and result[0] is False)
+
+
+# ---------------------------
+# Per-operation metrics
+# ---------------------------
+
+class OperationMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = {}
+
+    def wrap(self, name, method):
+        record = self.record
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            ok = False
+            try:
+                result = method(*args, **kwargs)
+                ok = not is_failure(result)
+                return result
+            finally:
+                record(name, time.perf_counter() - start, ok)
+
+        timed.__name__ = name
+        timed.__doc__ = method.__doc__
+        return timed
+
+    def record(self, name, seconds, ok):
+        with self._lock:
+            stats = self._operations.get(name)
+            if stats is None:
+                stats = self._operations[name] = {
+                    'calls': 0, 'errors': 0, 'seconds': 0.0, 'buckets': [0] * (len(BUCKETS) + 1)}
+            stats['calls'] += 1
+            if not ok:
+                stats['errors'] += 1
+            stats['seconds'] += seconds
+            stats['buckets'][bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def reset(self):
+        with self._lock:
+            self._operations = {}
+
+    def as_dict(self):
+        # operation -> calls, errors, total seconds and cumulative bucket counts
+        with self._lock:
+            exported = {}
+            for name, stats in self._operations.items():
+                cumulative, buckets = 0, {}
+                for bound, count in zip(BUCKETS + (float('inf'),), stats['buckets']):
+                    cumulative += count
+                    buckets[bound] = cumulative
+                exported[name] = {
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'seconds': stats['seconds'],
+                    'buckets': buckets,
+                }
+            return exported
+
+    def to_prometheus(self, prefix="library_operation"):
+        exported = self.as_dict()
+        lines = [
+            f"# HELP {prefix}_calls_total Calls per library operation.",
+            f"# TYPE {prefix}_calls_total counter",
+        ]
+        lines += [f'{prefix}_calls_total{{operation="{name}"}} {stats["calls"]}'
+                  for name, stats in exported.items()]
+        lines += [
+            f"# HELP {prefix}_errors_total Calls that returned a failure.",
+            f"# TYPE {prefix}_errors_total counter",
+        ]
+        lines += [f'{prefix}_errors_total{{operation="{name}"}} {stats["errors"]}'
+                  for name, stats in exported.items()]
+        lines += [
+            f"# HELP {prefix}_duration_seconds Latency per library operation.",
+            f"# TYPE {prefix}_duration_seconds histogram",
+        ]
+        for name, stats in exported.items():
+            for bound, count in stats['buckets'].items():
+                label = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f'{prefix}_duration_seconds_bucket{{operation="{name}",le="{label}"}} {count}')
+            lines.append(f'{prefix}_duration_seconds_sum{{operation="{name}"}} {stats["seconds"]}')
+            lines.append(f'{prefix}_duration_seconds_count{{operation="{name}"}} {stats["calls"]}')
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def profile_window(top=20, sort="cumulative", stream=None):
+    # Profiles everything run inside the block and prints the top entries
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats(sort).print_stats(top)
+        (stream or sys.stdout).write(report.getvalue())
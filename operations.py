@@ -1,332 +1,1435 @@
-import shutil
+import bisect
+import csv
+import heapq
+import itertools
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager, nullcontext
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from metrics import OperationMetrics, profile_window
+from query import plan_query, run_query
+from records import Book, Member
+from render import Renderer, format_book, format_member, format_search_result
+from sinks import ConsoleSink
+
+# Most books a fuzzy search scores, so its latency does not grow with the catalog
+FUZZY_CANDIDATES = 5000
+
+
+class _NgramIndex:
+    # Maps every lowercase n-gram of an indexed text to the keys containing it,
+    # so a substring query only has to check keys sharing all of its n-grams.
+
+    def __init__(self, n=3):
+        self.n = n
+        self._postings = {}
+        self._texts = {}
+        # Never raised on removal, so it stays a lower bound on text length
+        self._shortest = float('inf')
+
+    def _grams(self, text):
+        n = self.n
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def add(self, key, text):
+        text = text.lower()
+        self._texts[key] = text
+        self._shortest = min(self._shortest, len(text))
+        for gram in self._grams(text):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def extend(self, items):
+        # Bulk add of (key, text) pairs. Keys are grouped by text first, so
+        # a text shared by many books, such as an author, is split into
+        # n-grams once and its keys are added to each posting in one go.
+        by_text = {}
+        for key, text in items:
+            keys = by_text.get(text)
+            if keys is None:
+                by_text[text] = [key]
+            else:
+                keys.append(key)
+
+        postings = self._postings
+        texts = self._texts
+        for text, keys in by_text.items():
+            lowered = text.lower()
+            self._shortest = min(self._shortest, len(lowered))
+            if len(keys) == 1:
+                key = keys[0]
+                texts[key] = lowered
+                for gram in self._grams(lowered):
+                    posting = postings.get(gram)
+                    if posting is None:
+                        postings[gram] = {key}
+                    else:
+                        posting.add(key)
+                continue
+            for key in keys:
+                texts[key] = lowered
+            for gram in self._grams(lowered):
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = set(keys)
+                else:
+                    posting.update(keys)
+
+    def remove(self, key):
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        for gram in self._grams(text):
+            keys = self._postings[gram]
+            keys.discard(key)
+            if not keys:
+                del self._postings[gram]
+
+    def replace(self, key, text):
+        self.remove(key)
+        self.add(key, text)
+
+    def candidates(self, term):
+        # Returns None when the term is too short to use the index.
+        grams = self._grams(term)
+        if not grams:
+            return None
+        postings = []
+        for gram in grams:
+            keys = self._postings.get(gram)
+            if not keys:
+                return set()
+            postings.append(keys)
+        postings.sort(key=len)
+        result = set(postings[0])
+        for keys in postings[1:]:
+            result &= keys
+            if not result:
+                break
+        return result
+
+    def search(self, term):
+        term = term.lower()
+        candidates = self.candidates(term)
+        if candidates is None:
+            candidates = self._texts
+        return [key for key in candidates if term in self._texts[key]]
+
+    def similar(self, term, limit, min_score, order, max_candidates=FUZZY_CANDIDATES):
+        # Top-limit (score, key) pairs, best first, by trigram Jaccard
+        # similarity, taking a text's gram count as its number of gram
+        # positions. Postings are visited rarest gram first and every new key
+        # is scored exactly; a key first met in the j-th posting lacks the
+        # j - 1 rarer grams, which bounds its score, so the walk stops as soon
+        # as no unseen key could still enter the top results. Equal scores
+        # are ranked by order[key], the key's catalog position, so ties are
+        # cut the same way on every run.
+        # At most max_candidates keys are scored, so a term made of grams
+        # that thousands of texts share costs about the same at any catalog
+        # size.
+        # The posting that overflows the budget only has its earliest keys
+        # in catalog order scored (order iterates in catalog order); those
+        # already win any tie.
+        grams = tuple(self._grams(term.lower()))
+        if not grams or limit <= 0:
+            return []
+
+        texts = self._texts
+        # Rarest gram first, equal counts in gram order, so the budget is
+        # spent the same way on every run
+        ranked = sorted(grams, key=lambda gram: (len(self._postings.get(gram, ())), gram))
+        postings = [self._postings.get(gram, frozenset()) for gram in ranked]
+        shortest = max(self._shortest - self.n + 1, 1)
+        # Min-heap of (score, -position, key): its root is the entry the
+        # next better candidate replaces
+        top = []
+        seen = set()
+        budget = max_candidates
+        for rank, keys in enumerate(postings):
+            shared = len(grams) - rank
+            bound = shared / (len(grams) + max(shortest, shared) - shared)
+            # An unseen key scoring exactly the k-th score may still win its tie
+            if bound < min_score or (len(top) == limit and bound < top[0][0]):
+                break
+
+            fresh = keys - seen
+            if len(fresh) > budget:
+                # Walks the catalog from its start only until the budget is filled
+                fresh = list(itertools.islice(filter(fresh.__contains__, order), budget))
+            seen.update(fresh)
+            budget -= len(fresh)
+            for key in fresh:
+                text = texts[key]
+                common = sum(map(text.__contains__, grams))
+                score = common / (len(grams) + len(text) - self.n + 1 - common)
+                if score < min_score:
+                    continue
+                entry = (score, -order[key], key)
+                if len(top) < limit:
+                    heapq.heappush(top, entry)
+                elif entry[:2] > top[0][:2]:
+                    heapq.heapreplace(top, entry)
+            if not budget:
+                break
+        top.sort(reverse=True)
+        return [(score, key) for score, _, key in top]
+
+
+class _PrefixIndex:
+    # Sorted array of distinct lowercase texts for prefix completion. New
+    # texts are insorted into a small side array that is merged into the main
+    # one once it outgrows a fraction of it, so adds stay cheap at catalog
+    # scale. Texts that no book uses any more are skipped until that merge.
 
-class LibraryManagementSystem:
     def __init__(self):
+        self._sorted = []
+        self._recent = []
+        self._counts = {}
+        self._dead = set()
+
+    def add(self, text):
+        key = text.lower()
+        entry = self._counts.get(key)
+        if entry is not None:
+            entry[1] += 1
+            return
+        self._counts[key] = [text, 1]
+        if key in self._dead:
+            self._dead.discard(key)
+        else:
+            bisect.insort(self._recent, key)
+            self._compact()
+
+    def remove(self, text):
+        key = text.lower()
+        entry = self._counts[key]
+        entry[1] -= 1
+        if not entry[1]:
+            del self._counts[key]
+            self._dead.add(key)
+            self._compact()
+
+    def extend(self, texts):
+        # Bulk add with one sort instead of an insort per new text
+        counts = self._counts
+        for text in texts:
+            key = text.lower()
+            entry = counts.get(key)
+            if entry is None:
+                counts[key] = [text, 1]
+            else:
+                entry[1] += 1
+        self._sorted = sorted(counts)
+        self._recent = []
+        self._dead = set()
+
+    def _compact(self):
+        if len(self._recent) + len(self._dead) <= max(256, len(self._sorted) // 32):
+            return
+        merged = heapq.merge(self._sorted, self._recent)
+        self._sorted = [key for key in merged if key not in self._dead] if self._dead else list(merged)
+        self._recent = []
+        self._dead = set()
+
+    def complete(self, prefix, limit):
+        # Up to limit texts starting with prefix, alphabetically, as first added
+        prefix = prefix.lower()
+        found = []
+        for keys in (self._sorted, self._recent):
+            taken = 0
+            for index in range(bisect.bisect_left(keys, prefix), len(keys)):
+                key = keys[index]
+                if not key.startswith(prefix) or taken == limit:
+                    break
+                if key in self._counts:
+                    found.append(key)
+                    taken += 1
+        found.sort()
+        return [self._counts[key][0] for key in found[:limit]]
+
+
+class _DeferredIndex:
+    # Stands in for the title/author indexes while a catalog is being
+    # restored; they are built in one pass from the books afterwards.
+
+    def add(self, *args):
+        pass
+
+    def remove(self, *args):
+        pass
+
+    def replace(self, *args):
+        pass
+
+
+class _SearchCache:
+    # Bounded LRU of (search_type, lowercase term) -> matching ISBNs in
+    # catalog order. Only ISBNs are cached, so every hit builds a fresh result
+    # list around the live book records.
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            matches = self._entries.get(key)
+            if matches is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return matches
+
+    def put(self, key, matches, generation):
+        # Skipped if the catalog changed since the caller read generation
+        if not self.maxsize:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = tuple(matches)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, search_type, *texts):
+        # Drops the entries whose term occurs in any of the given texts, i.e.
+        # exactly the searches whose results the change can affect
+        with self._lock:
+            self.generation += 1
+            if not self._entries:
+                return
+            texts = [text.lower() for text in texts]
+            stale = [key for key in self._entries
+                     if key[0] == search_type and any(key[1] in text for text in texts)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+        }
+
+
+def _read_records(source):
+    # Yields one dict per record from a CSV/JSONL path or any iterable of dicts.
+    # A JSONL line that cannot be parsed is yielded as the exception instead.
+    if not isinstance(source, (str, os.PathLike)):
+        yield from source
+        return
+
+    with open(source, newline='', encoding='utf-8') as f:
+        if os.fspath(source).lower().endswith('.csv'):
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield e
+
+
+_NO_LOCK = nullcontext()
+
+
+class _StripedLocks:
+    # Guards per-ISBN and per-member state with a fixed pool of locks. Keys
+    # are hashed onto stripes and several stripes are always taken in
+    # ascending order, after the catalog and roster locks, so two operations
+    # can never wait on each other in a cycle.
+
+    def __init__(self, stripes=1024):
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        self.catalog = threading.Lock()
+        self.roster = threading.Lock()
+
+    @contextmanager
+    def hold(self, keys, catalog, roster):
+        locks = []
+        if catalog:
+            locks.append(self.catalog)
+        if roster:
+            locks.append(self.roster)
+        count = len(self._stripes)
+        locks.extend(self._stripes[stripe] for stripe in sorted({hash(key) % count for key in keys}))
+
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def hold_all(self):
+        # Waits out every operation in progress and keeps new ones out
+        return self.hold(range(len(self._stripes)), True, True)
+
+
+class LibraryManagementSystem:
+    # query_books() may start from the trigram, genre and ISBN indexes
+    _indexed_queries = True
+
+    def __init__(self, sink=None, concurrent=False, search_cache_size=256):
+        self.sink = sink if sink is not None else ConsoleSink()
+        self._locks = _StripedLocks() if concurrent else None
+        self._search_cache = _SearchCache(search_cache_size)
         self.books = {}
-        self.members = []
+        self._book_order = {}
+        self._next_book_order = 0
+        self._title_index = _NgramIndex()
+        self._author_index = _NgramIndex()
+        self._prefixes = {'title': _PrefixIndex(), 'author': _PrefixIndex()}
+        self._members_by_id = {}
+        self._members_by_email = {}
+        self._borrowers = {}
+        self._loaned_members = {}
+        self._member_order = {}
+        self._next_member_order = 0
+        self._book_listings = {}
+        self._member_listings = {}
+        self.page_size = 20
+        self.renderer = Renderer()
         self.valid_genres = ("Science Fiction", "Fantasy", "Thriller", "Non-Fiction", "Young Adult",
                            "Classic Literature", "Technology", "Business", "Art & Design")
+        self._genre_set = frozenset(self.valid_genres)
+        self._genre_index = {}
+        self._genre_counts = {}
+        self._counts_lock = threading.Lock() if concurrent else _NO_LOCK
         self.next_member_id = 1
+        self._listeners = []
+        self._sharded_search = None
+        self._parallel_threshold = None
+        self.change_feed = None
+        # Set by the Journal that records this library's mutations
+        self._journal = None
+        self.metrics = None
+        self._loading = None
+        self._load_error = None
+
+    @property
+    def members(self):
+        with self._guard(roster=True):
+            return list(self._members_by_id.values())
+
+    def _guard(self, *keys, catalog=False, roster=False):
+        # Locks the given ('book', isbn) / ('member', member_id) keys in
+        # concurrent mode. catalog/roster additionally serialize operations
+        # that change the shared book indexes or the member email index.
+        if self._locks is None:
+            return _NO_LOCK
+        return self._locks.hold(keys, catalog, roster)
+
+    def _exclusive(self):
+        # No other operation runs while this is held, e.g. for a consistent
+        # snapshot of a concurrent library
+        if self._locks is None:
+            return _NO_LOCK
+        return self._locks.hold_all()
 
     # ---------------------------
     # Helper print methods with new emojis
     # ---------------------------
+    # Messages are str.format templates; they are only formatted when the
+    # configured sink will actually output them.
 
-    def _print_success(self, message):
-        print(f"🎯 {message}")
+    def _emit(self, kind, message, args, heading):
+        sink = self.sink
+        if sink.enabled:
+            sink.emit(kind, message.format(*args) if args else message, heading)
 
-    def _print_error(self, message):
-        print(f"🚫 {message}")
+    def _print_success(self, message, *args, heading=False):
+        self._emit('success', message, args, heading)
 
-    def _print_info(self, message):
-        print(f"💡 {message}")
+    def _print_error(self, message, *args, heading=False):
+        self._emit('error', message, args, heading)
 
-    def _print_warning(self, message):
-        print(f"⚠️  {message}")
+    def _print_info(self, message, *args, heading=False):
+        self._emit('info', message, args, heading)
 
-    def _print_book(self, message):
-        print(f"📖 {message}")
+    def _print_warning(self, message, *args, heading=False):
+        self._emit('warning', message, args, heading)
 
-    def _print_member(self, message):
-        print(f"👨‍💼 {message}")
+    def _print_book(self, message, *args, heading=False):
+        self._emit('book', message, args, heading)
 
-    def _print_search(self, message):
-        print(f"🔎 {message}")
+    def _print_member(self, message, *args, heading=False):
+        self._emit('member', message, args, heading)
 
-    def _print_update(self, message):
-        print(f"🔄 {message}")
+    def _print_search(self, message, *args, heading=False):
+        self._emit('search', message, args, heading)
 
-    def _print_delete(self, message):
-        print(f"❌ {message}")
+    def _print_update(self, message, *args, heading=False):
+        self._emit('update', message, args, heading)
 
-    def _print_borrow(self, message):
-        print(f"📚 {message}")
+    def _print_delete(self, message, *args, heading=False):
+        self._emit('delete', message, args, heading)
 
-    def _print_return(self, message):
-        print(f"📥 {message}")
+    def _print_borrow(self, message, *args, heading=False):
+        self._emit('borrow', message, args, heading)
+
+    def _print_return(self, message, *args, heading=False):
+        self._emit('return', message, args, heading)
 
     def add_book(self, isbn, title, author, genre, total_copies):
-        print()
-        self._print_book("ADDING NEW BOOK TO LIBRARY COLLECTION")
-        print()
+        self._print_book("ADDING NEW BOOK TO LIBRARY COLLECTION", heading=True)
+
+        # The new ISBN's stripe keeps borrows out until the book is published
+        with self._guard(('book', isbn), catalog=True):
+            error = self._validate_new_book(isbn, title, author, genre, total_copies)
+            if error:
+                self._print_error(*error)
+                return False
+
+            self._insert_book(isbn, title, author, genre, total_copies)
+            self._notify('add_book', isbn=isbn, title=title, author=author,
+                         genre=genre, total_copies=total_copies)
 
+            self._print_success("Book '{}' added successfully to Library!", title)
+            return True
+
+    def _validate_new_book(self, isbn, title, author, genre, total_copies):
         if not isbn or not title or not author or not genre:
-            self._print_error("All fields are required!")
-            return False
+            return ("All fields are required!",)
 
         if isbn in self.books:
-            self._print_error(f"Book with ISBN '{isbn}' already exists!")
-            return False
+            return "Book with ISBN '{}' already exists!", isbn
 
-        if genre not in self.valid_genres:
-            self._print_error(f"Invalid genre! Must be one of: {self.valid_genres}")
-            return False
+        if genre not in self._genre_set:
+            return "Invalid genre! Must be one of: {}", self.valid_genres
 
         if total_copies <= 0:
-            self._print_error("Total copies cannot be less than or equal to 0!")
-            return False
+            return ("Total copies cannot be less than or equal to 0!",)
 
-        self.books[isbn] = {
-            'title': title,
-            'author': author,
-            'genre': genre,
-            'total_copies': total_copies,
-            'available_copies': total_copies
-        }
+        return None
 
-        self._print_success(f"Book '{title}' added successfully to Library!")
-        return True
+    def _insert_book(self, isbn, title, author, genre, total_copies):
+        self.books[isbn] = Book(title, author, genre, total_copies, total_copies)
+        self._book_order[isbn] = self._next_book_order
+        self._next_book_order += 1
+        self._book_listings.clear()
+        self._genre_index.setdefault(genre, {})[isbn] = None
+        self._count_copies(genre, 1, total_copies, total_copies)
+        self._title_index.add(isbn, title)
+        self._author_index.add(isbn, author)
+        self._prefixes['title'].add(title)
+        self._prefixes['author'].add(author)
+        self._search_cache.invalidate("title", title)
+        self._search_cache.invalidate("author", author)
 
     def add_member(self, name, email):
-        print()
-        self._print_member("REGISTERING NEW LIBRARY MEMBER")
-        print()
+        self._print_member("REGISTERING NEW LIBRARY MEMBER", heading=True)
+
+        with self._guard(roster=True):
+            error = self._validate_new_member(name, email)
+            if error:
+                self._print_error(*error)
+                return False
+
+            with self._guard(('member', self._new_member_id())):
+                member_id = self._insert_member(name, email)
+                self._notify('add_member', member_id=member_id, name=name, email=email)
+
+            self._print_success("Member '{}' registered successfully with ID: {}", name, member_id)
+            return True
 
+    def _validate_new_member(self, name, email):
         if not name or not email:
-            self._print_error("Name and email are required!")
-            return False
+            return ("Name and email are required!",)
 
-        for member in self.members:
-            if member['email'] == email:
-                self._print_error("Member with this email already exists!")
-                return False
+        if email in self._members_by_email:
+            return ("Member with this email already exists!",)
 
-        member_id = f"MEM{self.next_member_id:03d}"
-        self.next_member_id += 1
+        return None
 
-        self.members.append({
-            'member_id': member_id,
-            'name': name,
-            'email': email,
-            'borrowed_books': []
-        })
+    def _new_member_id(self):
+        # The ID the next registration gets; callers hold the roster lock
+        return f"MEM{self.next_member_id:03d}"
 
-        self._print_success(f"Member '{name}' registered successfully with ID: {member_id}")
-        return True
+    def _insert_member(self, name, email, member_id=None):
+        if member_id is None:
+            member_id = self._new_member_id()
+            self.next_member_id += 1
+
+        member = Member(member_id, name, email)
+        self._members_by_id[member_id] = member
+        self._members_by_email[email] = member
+        self._member_order[member_id] = self._next_member_order
+        self._next_member_order += 1
+        self._member_listings.clear()
+        return member_id
+
+    # ---------------------------
+    # Bulk import
+    # ---------------------------
+
+    def import_books(self, source, batch_size=1000):
+        def validate(row):
+            try:
+                isbn = row['isbn']
+                total_copies = int(row['total_copies'])
+                fields = (isbn, row['title'], row['author'], row['genre'], total_copies)
+            except KeyError as e:
+                return None, f"Missing field: {e.args[0]}"
+            except (TypeError, ValueError):
+                return None, "Total copies must be a number!"
+            error = self._validate_new_book(*fields)
+            return isbn, error[0].format(*error[1:]) if error else fields
+
+        def insert(fields):
+            isbn, title, author, genre, total_copies = fields
+            with self._guard(('book', isbn)):
+                self._insert_book(*fields)
+                self._notify('add_book', isbn=isbn, title=title, author=author,
+                             genre=genre, total_copies=total_copies)
+
+        return self._import_records(source, batch_size, validate, insert, catalog=True)
+
+    def import_members(self, source, batch_size=1000):
+        def validate(row):
+            try:
+                fields = (row['name'], row['email'])
+            except KeyError as e:
+                return None, f"Missing field: {e.args[0]}"
+            error = self._validate_new_member(*fields)
+            return fields[1], error[0].format(*error[1:]) if error else fields
+
+        def insert(fields):
+            name, email = fields
+            with self._guard(('member', self._new_member_id())):
+                member_id = self._insert_member(name, email)
+                self._notify('add_member', member_id=member_id, name=name, email=email)
+
+        return self._import_records(source, batch_size, validate, insert, roster=True)
+
+    def _import_records(self, source, batch_size, validate, insert, catalog=False, roster=False):
+        # validate(row) returns (unique_key, fields) on success or
+        # (unique_key, error_message) on failure; rows are never printed.
+        report = {'imported': 0, 'failed': 0, 'errors': []}
+        rows = enumerate(_read_records(source), start=1)
+
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+
+            with self._guard(catalog=catalog, roster=roster):
+                accepted = []
+                seen = set()
+                for row_number, row in batch:
+                    if isinstance(row, Exception):
+                        key, result = None, f"Malformed record: {row}"
+                    elif not isinstance(row, Mapping):
+                        key, result = None, "Malformed record: expected an object"
+                    else:
+                        key, result = validate(row)
+                        if not isinstance(result, str) and key in seen:
+                            result = f"Duplicate '{key}' earlier in the same import!"
+                    if isinstance(result, str):
+                        report['failed'] += 1
+                        report['errors'].append((row_number, result))
+                        continue
+                    seen.add(key)
+                    accepted.append(result)
+
+                # One clear per batch instead of checking the cache per row
+                if accepted:
+                    self._search_cache.clear()
+                for fields in accepted:
+                    insert(fields)
+                report['imported'] += len(accepted)
+
+        self._print_success("Imported {} record(s), {} failed", report['imported'], report['failed'])
+        return report
 
     def search_books(self, search_type, search_term):
-        print()
-        self._print_search("SEARCHING LIBRARY CATALOG")
-        print()
+        self._print_search("SEARCHING LIBRARY CATALOG", heading=True)
 
-        if not search_term:
-            self._print_error("Search term cannot be empty!")
+        error = self._validate_search(search_type, search_term)
+        if error:
+            self._print_error(*error)
             return False, []
 
-        results = []
         search_term = search_term.lower()
+        with self._guard(catalog=True):
+            results = [(isbn, self.books[isbn]) for isbn in self._search_matches(search_type, search_term)]
 
-        if search_type == "title":
-            for isbn, book in self.books.items():
-                if search_term in book['title'].lower():
-                    results.append((isbn, book))
-        elif search_type == "author":
-            for isbn, book in self.books.items():
-                if search_term in book['author'].lower():
-                    results.append((isbn, book))
+        if results:
+            self._print_success("Found {} book(s) matching '{}'", len(results), search_term)
         else:
-            self._print_error("Invalid search type! Use 'title' or 'author'")
+            self._print_info("No books found matching your search")
+
+        return True, results
+
+    def fuzzy_search_books(self, search_type, search_term, limit=10, min_score=0.1):
+        # Ranked search that tolerates typos: returns (True, [(isbn, book,
+        # score), ...]) for the limit most similar books, best first
+        self._print_search("FUZZY SEARCHING LIBRARY CATALOG", heading=True)
+
+        error = self._validate_search(search_type, search_term)
+        if error:
+            self._print_error(*error)
             return False, []
 
+        with self._guard(catalog=True):
+            index = self._title_index if search_type == "title" else self._author_index
+            # Equal scores keep catalog order
+            ranked = index.similar(search_term, limit, min_score, self._book_order)
+            results = [(isbn, self.books[isbn], round(score, 3)) for score, isbn in ranked]
+
         if results:
-            self._print_success(f"Found {len(results)} book(s) matching '{search_term}'")
+            self._print_success("Found {} book(s) similar to '{}'", len(results), search_term)
         else:
-            self._print_info("No books found matching your search")
+            self._print_info("No books found similar to your search")
 
         return True, results
 
+    def query_books(self, where=None, sort_by=None, descending=False, limit=None):
+        # Books matching a predicate tree (see query.py), e.g.
+        # ("and", ("genre", "==", "Fantasy"), ("available", "==", True))
+        self._print_search("QUERYING LIBRARY CATALOG", heading=True)
+
+        try:
+            with self._guard(catalog=True):
+                results = run_query(self, where, sort_by, descending, limit)
+        except ValueError as e:
+            self._print_error("Invalid query: {}", e)
+            return False, []
+
+        if results:
+            self._print_success("Found {} book(s) matching the query", len(results))
+        else:
+            self._print_info("No books found matching the query")
+        return True, results
+
+    def explain_query(self, where=None, sort_by=None, descending=False, limit=None):
+        # How query_books would run: its access path, filter and ordering
+        return "\n".join(plan_query(self, where, sort_by, descending, limit)[2])
+
+    def suggest(self, prefix, field="title", limit=10):
+        # Distinct titles or authors starting with prefix, ignoring case
+        if field not in self._prefixes:
+            raise ValueError("Invalid field! Use 'title' or 'author'")
+        if not prefix:
+            return []
+        with self._guard(catalog=True):
+            return self._prefixes[field].complete(prefix, limit)
+
+    def _validate_search(self, search_type, search_term):
+        if not search_term:
+            return ("Search term cannot be empty!",)
+
+        if search_type not in ("title", "author"):
+            return ("Invalid search type! Use 'title' or 'author'",)
+
+        return None
+
+    def _search_matches(self, search_type, search_term):
+        # Matching ISBNs in catalog order for a validated, lowercase term.
+        # Callers hold the catalog lock in concurrent mode.
+        key = (search_type, search_term)
+        matches = self._search_cache.get(key)
+        if matches is None:
+            generation = self._search_cache.generation
+            if self._sharded_search is not None and len(self.books) >= self._parallel_threshold:
+                matches = self._sharded_search.search(search_type, search_term)
+            elif search_type == "title":
+                matches = self._title_index.search(search_term)
+            else:
+                matches = self._author_index.search(search_term)
+
+            # Keep the catalog's insertion order, as a full scan would
+            matches.sort(key=self._book_order.__getitem__)
+            self._search_cache.put(key, matches, generation)
+        return matches
+
+    def search_cache_stats(self):
+        return self._search_cache.stats()
+
+    def enable_parallel_search(self, workers=None, threshold=100_000):
+        # Serves search_books from worker processes once the catalog holds
+        # at least threshold books; smaller catalogs stay in-process.
+        from parallel_search import ShardedSearch
+
+        self.disable_parallel_search()
+        self._sharded_search = ShardedSearch(self.books, workers)
+        self._parallel_threshold = threshold
+        self.add_mutation_listener(self._sharded_search.on_mutation)
+
+    def disable_parallel_search(self):
+        if self._sharded_search is None:
+            return
+        self.remove_mutation_listener(self._sharded_search.on_mutation)
+        self._sharded_search.close()
+        self._sharded_search = None
+
+    def enable_change_feed(self, capacity=10000, overflow="drop", block_timeout=1.0, start_seq=None):
+        # Publishes every mutation as a numbered event; see changefeed.py for
+        # the overflow policies. Numbering continues after start_seq, which
+        # defaults to the journal's last seq for a journaled library, so a
+        # consumer's saved seq stays valid across restarts, and to 0
+        # otherwise, so an unjournaled feed only resumes within one process.
+        from changefeed import ChangeFeed
+
+        # Waits for a lazy load so the journal's seq is final
+        self.wait_until_loaded("records")
+        self.disable_change_feed()
+        with self._exclusive():
+            if start_seq is None:
+                start_seq = self._journal.seq if self._journal is not None else 0
+            self.change_feed = ChangeFeed(capacity, overflow, block_timeout, start_seq)
+            self.add_mutation_listener(self.change_feed.publish)
+        return self.change_feed
+
+    def disable_change_feed(self):
+        if self.change_feed is None:
+            return
+        self.remove_mutation_listener(self.change_feed.publish)
+        self.change_feed = None
+
+    def read_changes(self, after_seq=0, limit=100):
+        # Events after after_seq, oldest first, for consumers that poll
+        if self.change_feed is None:
+            raise ValueError("Change feed is not enabled")
+        return self.change_feed.read(after_seq, limit)
+
     def update_book(self, isbn, field, new_value):
-        print()
-        self._print_update("UPDATING BOOK INFORMATION")
-        print()
+        self._print_update("UPDATING BOOK INFORMATION", heading=True)
 
-        if isbn not in self.books:
-            self._print_error(f"Book with ISBN '{isbn}' not found!")
-            return False
+        with self._guard(('book', isbn), catalog=field in ("title", "author", "genre")):
+            if isbn not in self.books:
+                self._print_error("Book with ISBN '{}' not found!", isbn)
+                return False
+
+            try:
+                if field == "title":
+                    if not new_value:
+                        self._print_error("Title cannot be empty!")
+                        return False
+                    self._set_book_field(isbn, field, new_value)
+                    self._print_success("Book title updated successfully!")
+
+                elif field == "author":
+                    if not new_value:
+                        self._print_error("Author cannot be empty!")
+                        return False
+                    self._set_book_field(isbn, field, new_value)
+                    self._print_success("Book author updated successfully!")
+
+                elif field == "genre":
+                    if new_value not in self._genre_set:
+                        self._print_error("Invalid genre! Must be one of: {}", self.valid_genres)
+                        return False
+                    self._set_book_field(isbn, field, new_value)
+                    self._print_success("Book genre updated successfully!")
+
+                elif field == "total_copies":
+                    try:
+                        new_value = int(new_value)
+                    except ValueError:
+                        self._print_error("Total copies must be a number!")
+                        return False
+                    if new_value < 0:
+                        self._print_error("Copies cannot be negative!")
+                        return False
+                    self._set_book_field(isbn, field, new_value)
+                    self._print_success("Total copies updated successfully!")
 
+                else:
+                    self._print_error("Invalid field! Use 'title', 'author', 'genre', or 'total_copies'")
+                    return False
+
+            except Exception as e:
+                self._print_error("Error updating book: {}", e)
+                return False
+
+            self._notify('update_book', isbn=isbn, field=field, value=new_value)
+            return True
+
+    def _set_book_field(self, isbn, field, value):
         book = self.books[isbn]
+        if field == "total_copies":
+            old_total, old_available = book.total_copies, book.available_copies
+            book.total_copies = value
+            book.available_copies = max(0, value - (old_total - old_available))
+            self._count_copies(book.genre, 0, value - old_total, book.available_copies - old_available)
+            return
 
-        try:
-            if field == "title":
+        old_value = getattr(book, field)
+        setattr(book, field, value)
+        self._book_listings.clear()
+        if field == "genre":
+            self._unindex_genre(isbn, old_value, book)
+            self._genre_index.setdefault(value, {})[isbn] = None
+            self._count_copies(value, 1, book.total_copies, book.available_copies)
+        elif field == "title":
+            self._title_index.replace(isbn, value)
+            self._search_cache.invalidate(field, old_value, value)
+        elif field == "author":
+            self._author_index.replace(isbn, value)
+            self._search_cache.invalidate(field, old_value, value)
+        if field in self._prefixes:
+            self._prefixes[field].remove(old_value)
+            self._prefixes[field].add(value)
+
+    def update_member(self, member_id, field, new_value):
+        self._print_update("UPDATING MEMBER INFORMATION", heading=True)
+
+        # Both fields feed the member listings, which the roster lock guards
+        with self._guard(('member', member_id), roster=True):
+            member = self._find_member_by_id(member_id)
+            if not member:
+                self._print_error("Member with ID '{}' not found!", member_id)
+                return False
+
+            if field == "name":
                 if not new_value:
-                    self._print_error("Title cannot be empty!")
+                    self._print_error("Name cannot be empty!")
                     return False
-                book['title'] = new_value
-                self._print_success("Book title updated successfully!")
-                return True
+                self._set_member_field(member_id, field, new_value)
+                self._print_success("Member name updated successfully!")
 
-            elif field == "author":
+            elif field == "email":
                 if not new_value:
-                    self._print_error("Author cannot be empty!")
+                    self._print_error("Email cannot be empty!")
                     return False
-                book['author'] = new_value
-                self._print_success("Book author updated successfully!")
-                return True
 
-            elif field == "genre":
-                if new_value not in self.valid_genres:
-                    self._print_error(f"Invalid genre! Must be one of: {self.valid_genres}")
+                existing = self._members_by_email.get(new_value)
+                if existing is not None and existing.member_id != member_id:
+                    self._print_error("Email already exists!")
                     return False
-                book['genre'] = new_value
-                self._print_success("Book genre updated successfully!")
-                return True
-
-            elif field == "total_copies":
-                try:
-                    new_copies = int(new_value)
-                    if new_copies < 0:
-                        self._print_error("Copies cannot be negative!")
-                        return False
 
-                    borrowed_count = book['total_copies'] - book['available_copies']
-                    book['total_copies'] = new_copies
-                    book['available_copies'] = max(0, new_copies - borrowed_count)
-                    self._print_success("Total copies updated successfully!")
-                    return True
-                except ValueError:
-                    self._print_error("Total copies must be a number!")
-                    return False
+                self._set_member_field(member_id, field, new_value)
+                self._print_success("Member email updated successfully!")
 
             else:
-                self._print_error("Invalid field! Use 'title', 'author', 'genre', or 'total_copies'")
+                self._print_error("Invalid field! Use 'name' or 'email'")
                 return False
 
-        except Exception as e:
-            self._print_error(f"Error updating book: {e}")
-            return False
+            self._notify('update_member', member_id=member_id, field=field, value=new_value)
+            return True
 
-    def update_member(self, member_id, field, new_value):
-        print()
-        self._print_update("UPDATING MEMBER INFORMATION")
-        print()
+    def _set_member_field(self, member_id, field, value):
+        member = self._members_by_id[member_id]
+        if field == "email":
+            del self._members_by_email[member.email]
+            self._members_by_email[value] = member
+        setattr(member, field, value)
+        self._member_listings.clear()
 
-        member = self._find_member_by_id(member_id)
-        if not member:
-            self._print_error(f"Member with ID '{member_id}' not found!")
-            return False
+    def delete_book(self, isbn):
+        self._print_delete("REMOVING BOOK FROM LIBRARY", heading=True)
+
+        with self._guard(('book', isbn), catalog=True):
+            if isbn not in self.books:
+                self._print_error("Book with ISBN '{}' not found!", isbn)
+                return False
+
+            book = self.books[isbn]
 
-        if field == "name":
-            if not new_value:
-                self._print_error("Name cannot be empty!")
+            if book.available_copies < book.total_copies:
+                self._print_error("Cannot delete book - some copies are currently borrowed!")
                 return False
-            member['name'] = new_value
-            self._print_success("Member name updated successfully!")
+
+            self._remove_book(isbn)
+            self._notify('delete_book', isbn=isbn)
+            self._print_success("Book removed successfully from library!")
             return True
 
-        elif field == "email":
-            if not new_value:
-                self._print_error("Email cannot be empty!")
+    def _remove_book(self, isbn):
+        book = self.books.pop(isbn)
+        del self._book_order[isbn]
+        self._book_listings.clear()
+        self._unindex_genre(isbn, book.genre, book)
+        self._title_index.remove(isbn)
+        self._author_index.remove(isbn)
+        self._prefixes['title'].remove(book.title)
+        self._prefixes['author'].remove(book.author)
+        self._search_cache.invalidate("title", book.title)
+        self._search_cache.invalidate("author", book.author)
+
+    def _unindex_genre(self, isbn, genre, book):
+        del self._genre_index[genre][isbn]
+        self._count_copies(genre, -1, -book.total_copies, -book.available_copies)
+
+    def delete_member(self, member_id):
+        self._print_delete("REMOVING MEMBER FROM LIBRARY", heading=True)
+
+        with self._guard(('member', member_id), roster=True):
+            member = self._find_member_by_id(member_id)
+            if not member:
+                self._print_error("Member with ID '{}' not found!", member_id)
                 return False
 
-            for m in self.members:
-                if m['email'] == new_value and m['member_id'] != member_id:
-                    self._print_error("Email already exists!")
-                    return False
+            if member.borrowed_books:
+                self._print_error("Cannot delete member - they have {} borrowed book(s)!", len(member.borrowed_books))
+                return False
 
-            member['email'] = new_value
-            self._print_success("Member email updated successfully!")
+            self._remove_member(member_id)
+            self._notify('delete_member', member_id=member_id)
+            self._print_success("Member removed successfully from library!")
             return True
 
-        else:
-            self._print_error("Invalid field! Use 'name' or 'email'")
-            return False
+    def _remove_member(self, member_id):
+        member = self._members_by_id.pop(member_id)
+        del self._members_by_email[member.email]
+        del self._member_order[member_id]
+        self._member_listings.clear()
 
-    def delete_book(self, isbn):
-        print()
-        self._print_delete("REMOVING BOOK FROM LIBRARY")
-        print()
+    def borrow_book(self, member_id, isbn):
+        self._print_borrow("PROCESSING BOOK BORROWAL", heading=True)
 
-        if isbn not in self.books:
-            self._print_error(f"Book with ISBN '{isbn}' not found!")
-            return False
+        with self._guard(('member', member_id), ('book', isbn)):
+            member = self._find_member_by_id(member_id)
+            if not member:
+                self._print_error("Member with ID '{}' not found!", member_id)
+                return False
 
-        book = self.books[isbn]
+            if len(member.borrowed_books) >= 3:
+                self._print_error("You have reached the maximum borrowing limit of 3 books!")
+                return False
 
-        if book['available_copies'] < book['total_copies']:
-            self._print_error("Cannot delete book - some copies are currently borrowed!")
-            return False
+            if isbn not in self.books:
+                self._print_error("Book with ISBN '{}' not found!", isbn)
+                return False
 
-        del self.books[isbn]
-        self._print_success("Book removed successfully from library!")
-        return True
+            book = self.books[isbn]
 
-    def delete_member(self, member_id):
-        print()
-        self._print_delete("REMOVING MEMBER FROM LIBRARY")
-        print()
+            if book.available_copies <= 0:
+                self._print_error("This book is currently not available!")
+                return False
 
-        member = self._find_member_by_id(member_id)
-        if not member:
-            self._print_error(f"Member with ID '{member_id}' not found!")
-            return False
+            if isbn in member.borrowed_books:
+                self._print_error("You have already borrowed this book!")
+                return False
 
-        if member['borrowed_books']:
-            self._print_error(f"Cannot delete member - they have {len(member['borrowed_books'])} borrowed book(s)!")
-            return False
+            self._lend_book(member_id, isbn)
+            self._notify('borrow_book', member_id=member_id, isbn=isbn)
 
-        self.members.remove(member)
-        self._print_success("Member removed successfully from library!")
-        return True
+            self._print_success("Book '{}' borrowed successfully!", book.title)
+            self._print_info("You now have {} book(s) borrowed", len(member.borrowed_books))
+            return True
 
-    def borrow_book(self, member_id, isbn):
-        print()
-        self._print_borrow("PROCESSING BOOK BORROWAL")
-        print()
+    def _lend_book(self, member_id, isbn):
+        book = self.books[isbn]
+        book.available_copies -= 1
+        self._count_available(book.genre, -1)
+        self._link_loan(self._members_by_id[member_id], isbn)
 
-        member = self._find_member_by_id(member_id)
-        if not member:
-            self._print_error(f"Member with ID '{member_id}' not found!")
-            return False
+    def _link_loan(self, member, isbn):
+        # Records the loan on the member and in the ISBN -> borrowers index
+        member.borrowed_books.add(isbn)
+        self._borrowers.setdefault(isbn, {})[member.member_id] = None
+        self._loaned_members[member.member_id] = None
 
-        if len(member['borrowed_books']) >= 3:
-            self._print_error("You have reached the maximum borrowing limit of 3 books!")
-            return False
+    def return_book(self, member_id, isbn):
+        self._print_return("PROCESSING BOOK RETURN", heading=True)
 
-        if isbn not in self.books:
-            self._print_error(f"Book with ISBN '{isbn}' not found!")
-            return False
+        with self._guard(('member', member_id), ('book', isbn)):
+            member = self._find_member_by_id(member_id)
+            if not member:
+                self._print_error("Member with ID '{}' not found!", member_id)
+                return False
+
+            if isbn not in member.borrowed_books:
+                self._print_error("You haven't borrowed this book!")
+                return False
 
+            if isbn not in self.books:
+                self._print_error("Book not found in library system!")
+                return False
+
+            self._take_back_book(member_id, isbn)
+            self._notify('return_book', member_id=member_id, isbn=isbn)
+
+            self._print_success("Book '{}' returned successfully!", self.books[isbn].title)
+            return True
+
+    def _take_back_book(self, member_id, isbn):
+        self._unlink_loan(self._members_by_id[member_id], isbn)
         book = self.books[isbn]
+        book.available_copies += 1
+        self._count_available(book.genre, 1)
+
+    def _unlink_loan(self, member, isbn):
+        member.borrowed_books.remove(isbn)
+        borrowers = self._borrowers[isbn]
+        del borrowers[member.member_id]
+        if not borrowers:
+            del self._borrowers[isbn]
+        if not member.borrowed_books:
+            del self._loaned_members[member.member_id]
 
-        if book['available_copies'] <= 0:
-            self._print_error("This book is currently not available!")
+    # ---------------------------
+    # Loan queries
+    # ---------------------------
+    # Every loan is recorded on the member and in an ISBN -> borrowers index,
+    # and members with at least one loan are tracked as they borrow and
+    # return, so these queries never scan the roster.
+
+    def current_borrowers(self, isbn):
+        # Members holding a copy of isbn, in the order they borrowed it
+        members = self._members_by_id
+        return [members[member_id] for member_id in list(self._borrowers.get(isbn, ()))]
+
+    def members_with_loans(self):
+        members = self._members_by_id
+        return [members[member_id] for member_id in list(self._loaned_members)]
+
+    def check_loans(self):
+        # Full scan comparing members' loans with the borrower index and each
+        # book's available copies; returns a list of problems, empty if none
+        self._print_info("CHECKING LOAN RECORDS", heading=True)
+
+        problems = []
+        with self._guard(catalog=True, roster=True):
+            holders = {}
+            for member_id, member in self._members_by_id.items():
+                for isbn in member.borrowed_books:
+                    holders.setdefault(isbn, set()).add(member_id)
+                if bool(member.borrowed_books) != (member_id in self._loaned_members):
+                    problems.append(f"Member '{member_id}' is misfiled in the members with loans")
+
+            for isbn in holders.keys() - self.books.keys():
+                problems.append(f"Book '{isbn}' is on loan but not in the catalog")
+
+            for isbn, book in self.books.items():
+                borrowers = set(self._borrowers.get(isbn, ()))
+                if borrowers != holders.get(isbn, set()):
+                    problems.append(f"Borrower index for book '{isbn}' does not match member loans")
+                if book.available_copies != max(0, book.total_copies - len(borrowers)):
+                    problems.append(f"Book '{isbn}' has {book.available_copies} available copies "
+                                    f"but {len(borrowers)} of {book.total_copies} on loan")
+
+        for problem in problems:
+            self._print_warning(problem)
+        if not problems:
+            self._print_success("All loan records are consistent!")
+        return problems
+
+    # ---------------------------
+    # Batch loans
+    # ---------------------------
+    # A batch is a list of ('borrow_book' | 'return_book', member_id, isbn)
+    # entries. Every entry is checked against the state the entries before
+    # it would leave behind, under one lock acquisition, and only then are
+    # they all applied; a single failing entry leaves the library untouched.
+
+    def borrow_many(self, member_id, isbns):
+        self._print_borrow("PROCESSING BATCH BORROWAL", heading=True)
+        return self._run_loans([('borrow_book', member_id, isbn) for isbn in isbns])
+
+    def return_many(self, member_id, isbns):
+        self._print_return("PROCESSING BATCH RETURN", heading=True)
+        return self._run_loans([('return_book', member_id, isbn) for isbn in isbns])
+
+    def execute_batch(self, operations):
+        self._print_update("PROCESSING BATCH TRANSACTION", heading=True)
+        return self._run_loans([tuple(operation) for operation in operations])
+
+    def _run_loans(self, operations):
+        if not operations:
+            self._print_error("No books given!")
             return False
 
-        if isbn in member['borrowed_books']:
-            self._print_error("You have already borrowed this book!")
+        if any(len(operation) != 3 for operation in operations):
+            self._print_error("Batch entries must be (operation, member_id, isbn)!")
             return False
 
-        book['available_copies'] -= 1
-        member['borrowed_books'].append(isbn)
+        keys = ()
+        if self._locks is not None:
+            keys = {('member', member_id) for _, member_id, _ in operations}
+            keys.update(('book', isbn) for _, _, isbn in operations)
 
-        self._print_success(f"Book '{book['title']}' borrowed successfully!")
-        self._print_info(f"You now have {len(member['borrowed_books'])} book(s) borrowed")
-        return True
+        with self._guard(*keys):
+            error, steps = self._plan_loans(operations)
+            if error:
+                self._print_error(*error)
+                self._print_info("No changes were made")
+                return False
 
-    def return_book(self, member_id, isbn):
-        print()
-        self._print_return("PROCESSING BOOK RETURN")
-        print()
+            for op, member, book, isbn in steps:
+                if op == 'borrow_book':
+                    book.available_copies -= 1
+                    self._link_loan(member, isbn)
+                    self._count_available(book.genre, -1)
+                else:
+                    self._unlink_loan(member, isbn)
+                    book.available_copies += 1
+                    self._count_available(book.genre, 1)
+                # Report each step as it lands, so a snapshot taken by a
+                # listener never holds steps that are still to be reported
+                self._notify(op, member_id=member.member_id, isbn=isbn)
+
+            self._print_success("{} book(s) processed successfully!", len(steps))
+            return True
 
-        member = self._find_member_by_id(member_id)
-        if not member:
-            self._print_error(f"Member with ID '{member_id}' not found!")
-            return False
+    def _plan_loans(self, operations):
+        # Returns (error, None) or (None, [(op, member, book, isbn), ...]),
+        # resolving every member and book once for the whole batch
+        steps = []
+        loans = {}
+        available = {}
+        members = self._members_by_id
+        books = self.books
+        for op, member_id, isbn in operations:
+            if op not in ('borrow_book', 'return_book'):
+                return ("Unsupported batch operation: {}", op), None
+
+            # Member loans and available copies as the earlier entries leave them
+            loan = loans.get(member_id)
+            if loan is None:
+                member = members.get(member_id)
+                if member is None:
+                    return ("Member with ID '{}' not found!", member_id), None
+                loan = loans[member_id] = (member, set(member.borrowed_books))
+            member, borrowed = loan
+
+            book = books.get(isbn)
+            copies = available.get(isbn, book.available_copies if book is not None else 0)
+
+            if op == 'borrow_book':
+                if len(borrowed) >= 3:
+                    return ("You have reached the maximum borrowing limit of 3 books!",), None
+                if book is None:
+                    return ("Book with ISBN '{}' not found!", isbn), None
+                if copies <= 0:
+                    return ("Book '{}' is currently not available!", isbn), None
+                if isbn in borrowed:
+                    return ("You have already borrowed book '{}'!", isbn), None
+                borrowed.add(isbn)
+                available[isbn] = copies - 1
+            else:
+                if isbn not in borrowed:
+                    return ("You haven't borrowed book '{}'!", isbn), None
+                if book is None:
+                    return ("Book not found in library system!",), None
+                borrowed.discard(isbn)
+                available[isbn] = copies + 1
+            steps.append((op, member, book, isbn))
+        return None, steps
 
-        if isbn not in member['borrowed_books']:
-            self._print_error("You haven't borrowed this book!")
-            return False
+    # ---------------------------
+    # Metrics and profiling
+    # ---------------------------
+    # enable_metrics() shadows each public operation with a timed wrapper on
+    # this instance; disable_metrics() deletes the wrappers again, so a
+    # library without metrics pays nothing for them.
+
+    INSTRUMENTED_OPERATIONS = (
+        'add_book', 'add_member', 'import_books', 'import_members', 'search_books', 'fuzzy_search_books',
+        'query_books', 'suggest', 'update_book', 'update_member', 'delete_book', 'delete_member', 'borrow_book',
+        'return_book', 'borrow_many', 'return_many', 'execute_batch',
+        'get_book_details', 'get_member_details', 'get_all_books', 'get_all_members',
+        'books_by_genre', 'genre_stats', 'current_borrowers', 'members_with_loans', 'check_loans',
+    )
+
+    def enable_metrics(self, metrics=None):
+        # Waits for a lazy load so the wrappers never stack on its gates
+        self.wait_until_loaded()
+        self.disable_metrics()
+        self.metrics = metrics if metrics is not None else OperationMetrics()
+        for name in self.INSTRUMENTED_OPERATIONS:
+            setattr(self, name, self.metrics.wrap(name, getattr(self, name)))
+        return self.metrics
+
+    def disable_metrics(self):
+        if self.metrics is None:
+            return
+        for name in self.INSTRUMENTED_OPERATIONS:
+            self.__dict__.pop(name, None)
+        self.metrics = None
 
-        if isbn not in self.books:
-            self._print_error("Book not found in library system!")
-            return False
+    def profile(self, top=20, sort="cumulative", stream=None):
+        # with library.profile(): ... prints the top hot spots of the block
+        return profile_window(top, sort, stream)
+
+    # ---------------------------
+    # Mutation listeners and state export
+    # ---------------------------
+    # Every successful mutation is reported to the listeners as (op, record),
+    # where record holds the arguments apply_mutation() needs to redo it.
+
+    def add_mutation_listener(self, listener):
+        self._listeners.append(listener)
+
+    def remove_mutation_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def _notify(self, op, **record):
+        for listener in self._listeners:
+            listener(op, record)
+
+    def apply_mutation(self, op, record):
+        # Redoes an already validated mutation silently and without notifying
+        # listeners, e.g. when replaying a journal.
+        if op == 'add_book':
+            self._insert_book(record['isbn'], record['title'], record['author'],
+                              record['genre'], record['total_copies'])
+        elif op == 'add_member':
+            self._insert_member(record['name'], record['email'], record['member_id'])
+            self.next_member_id += 1
+        elif op == 'update_book':
+            self._set_book_field(record['isbn'], record['field'], record['value'])
+        elif op == 'update_member':
+            self._set_member_field(record['member_id'], record['field'], record['value'])
+        elif op == 'delete_book':
+            self._remove_book(record['isbn'])
+        elif op == 'delete_member':
+            self._remove_member(record['member_id'])
+        elif op == 'borrow_book':
+            self._lend_book(record['member_id'], record['isbn'])
+        elif op == 'return_book':
+            self._take_back_book(record['member_id'], record['isbn'])
+        else:
+            raise ValueError(f"Unknown mutation: {op}")
+
+    def export_state(self):
+        return {
+            'next_member_id': self.next_member_id,
+            'books': [dict(book, isbn=isbn) for isbn, book in self.books.items()],
+            'members': [dict(member, borrowed_books=list(member.borrowed_books))
+                        for member in self._members_by_id.values()],
+        }
 
-        member['borrowed_books'].remove(isbn)
-        self.books[isbn]['available_copies'] += 1
+    @classmethod
+    def from_state(cls, state, sink=None):
+        return cls.from_loader(lambda library: library.restore_state(state), sink)
+
+    def restore_state(self, state):
+        # Fills an empty library from export_state() output
+        for book in state['books']:
+            self._insert_book(book['isbn'], book['title'], book['author'],
+                              book['genre'], book['total_copies'])
+            self.books[book['isbn']].available_copies = book['available_copies']
+            self._count_copies(book['genre'], 0, 0, book['available_copies'] - book['total_copies'])
+        for member in state['members']:
+            self._insert_member(member['name'], member['email'], member['member_id'])
+            for isbn in member['borrowed_books']:
+                self._link_loan(self._members_by_id[member['member_id']], isbn)
+        self.next_member_id = state['next_member_id']
 
-        self._print_success(f"Book '{self.books[isbn]['title']}' returned successfully!")
+    # ---------------------------
+    # Restoring and lazy loading
+    # ---------------------------
+    # A restore runs in two stages: loader(library) fills in the records,
+    # e.g. through restore_state() and apply_mutation(), with the title and
+    # author indexes switched off; then those indexes, which take most of
+    # the time on a large catalog, are built in one pass. With lazy=True the
+    # library is returned at once and both stages run on a background
+    # thread. Until a stage is done, the operations below wait for it, so
+    # a desk can borrow and return as soon as the records are in while
+    # searching waits for the indexes.
+
+    RECORD_OPERATIONS = (
+        'add_member', 'import_members', 'update_member', 'delete_member', 'borrow_book', 'return_book',
+        'borrow_many', 'return_many', 'execute_batch', 'get_book_details', 'get_member_details',
+        'get_all_books', 'get_all_members', 'books_by_genre', 'genre_stats', 'current_borrowers',
+        'members_with_loans', 'check_loans', 'iter_books', 'iter_members', 'page_books', 'page_members',
+        'export_state',
+    )
+    # Operations that read or change the title/author indexes
+    SEARCH_OPERATIONS = (
+        'add_book', 'import_books', 'update_book', 'delete_book', 'search_books', 'fuzzy_search_books',
+        'query_books', 'explain_query', 'suggest', 'page_search',
+    )
+
+    @classmethod
+    def from_loader(cls, loader, sink=None, lazy=False, concurrent=False):
+        library = cls(sink, concurrent=concurrent)
+        if not lazy:
+            library._load(loader)
+            return library
+
+        library._loading = {'records': threading.Event(), 'search': threading.Event()}
+        gates = {name: library._gate(name, 'records') for name in cls.RECORD_OPERATIONS}
+        gates.update((name, library._gate(name, 'search')) for name in cls.SEARCH_OPERATIONS)
+        library.__dict__.update(gates)
+
+        def load():
+            try:
+                library._load(loader, library._loading['records'].set)
+            except Exception as e:
+                # The gates stay, so every gated call reports the failure
+                library._load_error = e
+            else:
+                # New calls go straight to the methods before waiters wake
+                for name, gate in gates.items():
+                    if library.__dict__.get(name) is gate:
+                        del library.__dict__[name]
+            for stage in library._loading.values():
+                stage.set()
+
+        threading.Thread(target=load, name="library-loader", daemon=True).start()
+        return library
+
+    def _load(self, loader, records_loaded=None):
+        self._title_index = self._author_index = _DeferredIndex()
+        self._prefixes = {'title': _DeferredIndex(), 'author': _DeferredIndex()}
+        loader(self)
+        if records_loaded is not None:
+            records_loaded()
+
+        title_index, author_index = _NgramIndex(), _NgramIndex()
+        titles, authors = _PrefixIndex(), _PrefixIndex()
+        title_index.extend((isbn, book.title) for isbn, book in self.books.items())
+        author_index.extend((isbn, book.author) for isbn, book in self.books.items())
+        titles.extend(book.title for book in self.books.values())
+        authors.extend(book.author for book in self.books.values())
+        self._title_index, self._author_index = title_index, author_index
+        self._prefixes = {'title': titles, 'author': authors}
+
+    def _gate(self, name, stage):
+        method = getattr(self, name)
+        loaded = self._loading[stage]
+
+        def gated(*args, **kwargs):
+            if not loaded.is_set():
+                self.wait_until_loaded(stage)
+            elif self._load_error is not None:
+                raise RuntimeError(f"Catalog failed to load: {self._load_error}")
+            return method(*args, **kwargs)
+        return gated
+
+    def wait_until_loaded(self, stage="search", timeout=None):
+        # True once the stage is done (always, unless loaded lazily)
+        if self._loading is None:
+            return True
+        if not self._loading[stage].wait(timeout):
+            return False
+        if self._load_error is not None:
+            raise RuntimeError(f"Catalog failed to load: {self._load_error}")
         return True
 
+    @property
+    def loading(self):
+        return self._loading is not None and not self._loading['search'].is_set()
+
     def get_book_details(self, isbn):
         return self.books.get(isbn)
 
@@ -340,35 +1443,174 @@ class LibraryManagementSystem:
         return self.members
 
     def _find_member_by_id(self, member_id):
-        for member in self.members:
-            if member['member_id'] == member_id:
-                return member
-        return None
+        return self._members_by_id.get(member_id)
+
+    # ---------------------------
+    # Genre index
+    # ---------------------------
+    # Every book is filed under its genre, and each genre keeps running
+    # counts of its titles, total copies and available copies, so neither
+    # query below has to look at the rest of the catalog.
+
+    def books_by_genre(self, genre):
+        # [(isbn, book), ...] in the order the books joined the genre
+        with self._guard(catalog=True):
+            return [(isbn, self.books[isbn]) for isbn in self._genre_index.get(genre, ())]
+
+    def genre_stats(self):
+        stats = {genre: {'titles': 0, 'total_copies': 0, 'available_copies': 0} for genre in self.valid_genres}
+        with self._counts_lock:
+            for genre, counts in self._genre_counts.items():
+                stats[genre] = dict(counts)
+        return stats
+
+    def _count_copies(self, genre, titles, total_copies, available_copies):
+        with self._counts_lock:
+            counts = self._genre_counts.get(genre)
+            if counts is None:
+                counts = self._genre_counts[genre] = {'titles': 0, 'total_copies': 0, 'available_copies': 0}
+            counts['titles'] += titles
+            counts['total_copies'] += total_copies
+            counts['available_copies'] += available_copies
+
+    def _count_available(self, genre, delta):
+        # Loan fast path; the genre already has counts while it has books
+        with self._counts_lock:
+            self._genre_counts[genre]['available_copies'] += delta
+
+    # ---------------------------
+    # Paginated listings
+    # ---------------------------
+    # Listings walk a sorted snapshot of keys that is only rebuilt after a
+    # change that could reorder it. A cursor is the (sort value, key) pair of
+    # the last item returned, so the next page starts with a bisect and stays
+    # correct when records are added or removed between pages. With no
+    # sort_key, books keep catalog order and members registration order. In
+    # concurrent mode the snapshot is taken and searched, and each page
+    # read, under the catalog or roster lock.
+
+    def iter_books(self, cursor=None, offset=0, limit=None, sort_key=None):
+        with self._guard(catalog=True):
+            listing = self._book_listing(sort_key)
+            start = self._start(listing, cursor)
+        yield from itertools.islice(self._walk(listing, self.books, start + offset), limit)
+
+    def iter_members(self, cursor=None, offset=0, limit=None, sort_key=None):
+        with self._guard(roster=True):
+            listing = self._member_listing(sort_key)
+            start = self._start(listing, cursor)
+        for _, member in itertools.islice(self._walk(listing, self._members_by_id, start + offset), limit):
+            yield member
+
+    def page_books(self, cursor=None, limit=None, sort_key=None):
+        # Returns ([(isbn, book), ...], next_cursor); next_cursor is None on the last page
+        with self._guard(catalog=True):
+            return self._page(self._book_listing(sort_key), self.books, cursor, limit)
+
+    def page_members(self, cursor=None, limit=None, sort_key=None):
+        # Returns ([member, ...], next_cursor); next_cursor is None on the last page
+        with self._guard(roster=True):
+            page, next_cursor = self._page(self._member_listing(sort_key), self._members_by_id, cursor, limit)
+        return [member for _, member in page], next_cursor
+
+    def page_search(self, search_type, search_term, cursor=None, limit=None):
+        # Returns (success, [(isbn, book), ...], next_cursor); pages follow
+        # catalog order like search_books. The sorted ISBNs of all matches
+        # are still found (and kept in the search cache), but only one page
+        # of (isbn, book) pairs is built.
+        error = self._validate_search(search_type, search_term)
+        if error:
+            self._print_error(*error)
+            return False, [], None
+
+        order = self._book_order
+        with self._guard(catalog=True):
+            matches = self._search_matches(search_type, search_term.lower())
+            listing = (matches, lambda key: (order[key], key))
+            return (True,) + self._page(listing, self.books, cursor, limit)
+
+    def _book_listing(self, sort_key):
+        return self._listing(self._book_listings, self.books, self._book_order,
+                             sort_key, ("isbn", "title", "author", "genre"))
+
+    def _member_listing(self, sort_key):
+        return self._listing(self._member_listings, self._members_by_id, self._member_order,
+                             sort_key, ("member_id", "name", "email"))
+
+    def _listing(self, listings, records, order, sort_key, sort_keys):
+        # Returns (keys in listing order, key -> cursor for that key)
+        if sort_key is not None and sort_key not in sort_keys:
+            raise ValueError(f"Invalid sort key! Use one of: {sort_keys}")
+
+        listing = listings.get(sort_key)
+        if listing is None:
+            if sort_key is None:
+                position = lambda key: (order[key], key)
+            elif sort_key in ("isbn", "member_id"):
+                position = lambda key: (key, key)
+            else:
+                position = lambda key: (records[key][sort_key].lower(), key)
+
+            # Catalog and registration order is the dicts' insertion order
+            keys = list(records) if sort_key is None else sorted(records)
+            if sort_key not in (None, "isbn", "member_id"):
+                # Stable sort by value alone: ties keep key order and no
+                # tuple per record is allocated
+                keys.sort(key=lambda key: records[key][sort_key].lower())
+            listing = listings[sort_key] = (keys, position)
+        return listing
+
+    def _start(self, listing, cursor):
+        # Index of the first key after cursor in the snapshot
+        keys, position = listing
+        return bisect.bisect_right(keys, tuple(cursor), key=position) if cursor is not None else 0
+
+    def _walk(self, listing, records, start):
+        # Yields (key, record) from a snapshot, skipping keys that were
+        # removed after it was taken
+        keys = listing[0]
+        for index in range(start, len(keys)):
+            key = keys[index]
+            record = records.get(key)
+            if record is not None:
+                yield key, record
+
+    def _page(self, listing, records, cursor, limit):
+        limit = limit or self.page_size
+        page = list(itertools.islice(self._walk(listing, records, self._start(listing, cursor)), limit + 1))
+        if len(page) <= limit:
+            return page, None
+        del page[limit:]
+        return page, listing[1](page[-1][0])
 
     def display_menu(self):
-        terminal_width = shutil.get_terminal_size().columns
-        print()
-        print("=" * (terminal_width // 2))
-        print("🏢 LIBRARY MANAGEMENT SYSTEM 🏢".center(terminal_width))
-        print("=" * (terminal_width // 2))
-        print("📖 1. Add New Book")
-        print("👨‍💼 2. Register New Member")
-        print("🔎 3. Search Books")
-        print("🔄 4. Update Book Details")
-        print("👤 5. Update Member Information")
-        print("❌ 6. Remove Book")
-        print("👋 7. Remove Member")
-        print("📚 8. Borrow Book")
-        print("📥 9. Return Book")
-        print("📋 10. Display All Books")
-        print("👥 11. Display All Members")
-        print("🚪 12. Exit System")
-        print("=" * (terminal_width // 2))
+        terminal_width = self.renderer.terminal_size().columns
+        rule = "=" * (terminal_width // 2)
+        self.renderer.write(
+            f"\n{rule}\n"
+            f"{'🏢 LIBRARY MANAGEMENT SYSTEM 🏢'.center(terminal_width)}\n"
+            f"{rule}\n"
+            "📖 1. Add New Book\n"
+            "👨‍💼 2. Register New Member\n"
+            "🔎 3. Search Books\n"
+            "🔄 4. Update Book Details\n"
+            "👤 5. Update Member Information\n"
+            "❌ 6. Remove Book\n"
+            "👋 7. Remove Member\n"
+            "📚 8. Borrow Book\n"
+            "📥 9. Return Book\n"
+            "📋 10. Display All Books\n"
+            "👥 11. Display All Members\n"
+            "🚪 12. Exit System\n"
+            f"{rule}\n"
+        )
 
     def run_interactive(self):
         print()
         print("🌟 WELCOME TO LIBRARY MANAGEMENT SYSTEM! 🌟")
         print("Your gateway to knowledge and discovery! 💫")
+        if self.loading:
+            self._print_info("Loading the catalog in the background; searches wait until it is ready")
 
         while True:
             self.display_menu()
@@ -406,12 +1648,10 @@ class LibraryManagementSystem:
                     self._print_error("Please enter a valid choice (1-12)!")
 
             except Exception as e:
-                self._print_error(f"An error occurred: {e}")
+                self._print_error("An error occurred: {}", e)
 
     def _interactive_add_book(self):
-        print()
-        self._print_book("ADDING NEW BOOK TO COLLECTION")
-        print()
+        self._print_book("ADDING NEW BOOK TO COLLECTION", heading=True)
         isbn = input("Enter ISBN: ").strip()
         title = input("Enter title: ").strip()
         author = input("Enter author: ").strip()
@@ -425,40 +1665,68 @@ class LibraryManagementSystem:
         self.add_book(isbn, title, author, genre, total_copies)
 
     def _interactive_add_member(self):
-        print()
-        self._print_member("REGISTERING NEW MEMBER")
-        print()
+        self._print_member("REGISTERING NEW MEMBER", heading=True)
         name = input("Enter member name: ").strip()
         email = input("Enter email: ").strip()
 
         self.add_member(name, email)
 
     def _interactive_search_books(self):
-        print()
-        self._print_search("SEARCHING LIBRARY CATALOG")
-        print()
+        self._print_search("SEARCHING LIBRARY CATALOG", heading=True)
         search_type = input("Search by (title/author): ").strip()
-        search_term = input("Enter search term: ").strip()
+        with self._tab_completion(search_type):
+            search_term = input("Enter search term (Tab completes): ").strip()
 
-        success, result = self.search_books(search_type, search_term)
-        if success and result:
-            print()
+        success, page, cursor = self.page_search(search_type, search_term)
+        if success and not page:
+            self._print_info("No books found matching your search")
+            success, similar = self.fuzzy_search_books(search_type, search_term, limit=5)
+            if similar:
+                self.renderer.write("\n")
+                self._print_book("DID YOU MEAN")
+                self.renderer.write_records(((isbn, book) for isbn, book, score in similar), format_search_result)
+        elif success:
+            self.renderer.write("\n")
             self._print_book("SEARCH RESULTS")
-            for isbn, book in result:
-                available = book['available_copies']
-                total = book['total_copies']
-                status = "🎯 Available" if available > 0 else "🚫 Out of Stock"
-                print(f"   ISBN: {isbn}")
-                print(f"   Title: {book['title']}")
-                print(f"   Author: {book['author']}")
-                print(f"   Genre: {book['genre']}")
-                print(f"   Status: {available}/{total} copies - {status}")
-                print("   " + "-" * 40)
+
+            def fetch_page(next_cursor, limit):
+                if next_cursor is None:
+                    return page, cursor
+                return self.page_search(search_type, search_term, next_cursor, limit)[1:]
+
+            self._page_through(fetch_page, format_search_result)
+
+    @contextmanager
+    def _tab_completion(self, field):
+        # Completes the whole input line from suggest() on Tab, where the
+        # terminal supports readline
+        try:
+            import readline
+        except ImportError:
+            readline = None
+        if readline is None or field not in self._prefixes:
+            yield
+            return
+
+        matches = []
+
+        def complete(text, state):
+            if state == 0:
+                matches[:] = self.suggest(readline.get_line_buffer(), field, limit=50)
+            return matches[state] if state < len(matches) else None
+
+        previous = readline.get_completer(), readline.get_completer_delims()
+        readline.set_completer(complete)
+        readline.set_completer_delims("")
+        readline.parse_and_bind("tab: complete")
+        try:
+            yield
+        finally:
+            readline.set_completer(previous[0])
+            readline.set_completer_delims(previous[1])
 
     def _interactive_update_book(self):
-        print()
-        self._print_update("UPDATING BOOK INFORMATION")
-        print()
+        self._print_update("UPDATING BOOK INFORMATION", heading=True)
         isbn = input("Enter ISBN of book to update: ").strip()
         field = input("Enter field to update (title/author/genre/total_copies): ").strip()
         new_value = input("Enter new value: ").strip()
@@ -466,9 +1734,7 @@ class LibraryManagementSystem:
         self.update_book(isbn, field, new_value)
 
     def _interactive_update_member(self):
-        print()
-        self._print_update("UPDATING MEMBER INFORMATION")
-        print()
+        self._print_update("UPDATING MEMBER INFORMATION", heading=True)
         member_id = input("Enter member ID to update: ").strip()
         field = input("Enter field to update (name/email): ").strip()
         new_value = input("Enter new value: ").strip()
@@ -476,75 +1742,138 @@ class LibraryManagementSystem:
         self.update_member(member_id, field, new_value)
 
     def _interactive_delete_book(self):
-        print()
-        self._print_delete("REMOVING BOOK FROM LIBRARY")
-        print()
+        self._print_delete("REMOVING BOOK FROM LIBRARY", heading=True)
         isbn = input("Enter ISBN of book to remove: ").strip()
 
         self.delete_book(isbn)
 
     def _interactive_delete_member(self):
-        print()
-        self._print_delete("REMOVING MEMBER FROM LIBRARY")
-        print()
+        self._print_delete("REMOVING MEMBER FROM LIBRARY", heading=True)
         member_id = input("Enter member ID to remove: ").strip()
 
         self.delete_member(member_id)
 
     def _interactive_borrow_book(self):
-        print()
-        self._print_borrow("BORROWING BOOK")
-        print()
+        self._print_borrow("BORROWING BOOK", heading=True)
         member_id = input("Enter your member ID: ").strip()
-        isbn = input("Enter ISBN of book to borrow: ").strip()
+        isbns = [isbn.strip() for isbn in input("Enter ISBN(s) of book(s) to borrow, comma separated: ").split(",")]
 
-        self.borrow_book(member_id, isbn)
+        if len(isbns) > 1:
+            self.borrow_many(member_id, isbns)
+        else:
+            self.borrow_book(member_id, isbns[0])
 
     def _interactive_return_book(self):
-        print()
-        self._print_return("RETURNING BOOK")
-        print()
+        self._print_return("RETURNING BOOK", heading=True)
         member_id = input("Enter your member ID: ").strip()
-        isbn = input("Enter ISBN of book to return: ").strip()
+        isbns = [isbn.strip() for isbn in input("Enter ISBN(s) of book(s) to return, comma separated: ").split(",")]
 
-        self.return_book(member_id, isbn)
+        if len(isbns) > 1:
+            self.return_many(member_id, isbns)
+        else:
+            self.return_book(member_id, isbns[0])
 
     def _display_all_books(self):
-        print()
-        self._print_book("COMPLETE LIBRARY COLLECTION")
-        print()
-        books = self.get_all_books()
-        if not books:
+        self._print_book("COMPLETE LIBRARY COLLECTION", heading=True)
+        self.wait_until_loaded("records")
+        if not self.books:
             self._print_info("No books in the library collection yet.")
             return
 
-        for isbn, book in books.items():
-            available = book['available_copies']
-            total = book['total_copies']
-            status = "🎯 Available" if available > 0 else "🚫 Out of Stock"
-            print(f"📖 {book['title']} by {book['author']}")
-            print(f"   ISBN: {isbn}")
-            print(f"   Genre: {book['genre']}")
-            print(f"   Status: {available}/{total} copies - {status}")
-            print("   " + "=" * 30)
+        self._page_through(self.page_books, format_book)
 
     def _display_all_members(self):
-        print()
-        self._print_member("REGISTERED LIBRARY MEMBERS")
-        print()
-        members = self.get_all_members()
-        if not members:
+        self._print_member("REGISTERED LIBRARY MEMBERS", heading=True)
+        self.wait_until_loaded("records")
+        if not self._members_by_id:
             self._print_info("No members registered in the library yet.")
             return
 
-        for member in members:
-            borrowed_count = len(member['borrowed_books'])
-            print(f"👨‍💼 {member['name']}")
-            print(f"   ID: {member['member_id']}")
-            print(f"   Email: {member['email']}")
-            print(f"   Borrowed Books: {borrowed_count}")
-            print("   " + "•" * 30)
+        self._page_through(self.page_members, format_member)
+
+    def _page_through(self, fetch_page, format_record):
+        # fetch_page(cursor, limit) returns (items, next_cursor). Every page
+        # is written in one go and the desk is asked before the next one;
+        # the rest of a listing can also go to a pager or a file.
+        cursor = None
+        shown = 0
+        while True:
+            items, cursor = fetch_page(cursor, self.page_size)
+            self.renderer.write_records(items, format_record)
+            shown += len(items)
+            if cursor is None:
+                return shown
+            answer = input(f"-- {shown} shown. Press Enter for more, 'p' for a pager, "
+                           f"'w FILE' to save the rest or 'q' to stop: ").strip()
+            if answer.lower() == "q":
+                return shown
+            if answer.lower() == "p" or answer[:2].lower() == "w ":
+                break
+
+        def rest(cursor):
+            while cursor is not None:
+                items, cursor = fetch_page(cursor, 1000)
+                yield "".join(map(format_record, items))
+
+        if answer.lower() == "p":
+            if not self.renderer.to_pager(rest(cursor)):
+                self._print_error("Could not start the pager! Set PAGER to one that is installed.")
+            return shown
+
+        path = answer[2:].strip()
+        try:
+            self.renderer.to_file(rest(cursor), path)
+        except OSError as e:
+            self._print_error("Could not save the listing: {}", e)
+            return shown
+        self._print_success("Rest of the listing saved to '{}'", path)
+        return shown
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Library Management System")
+    parser.add_argument("--data", metavar="DIR",
+                        help="journal directory to load and keep the library in; the menu opens while it loads")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="run the commands or JSON requests in FILE ('-' for stdin) instead of the menu")
+    parser.add_argument("--sqlite", metavar="PATH",
+                        help="keep the library in the SQLite database at PATH instead of in memory")
+    options = parser.parse_args(argv)
+    if options.data is not None and options.sqlite is not None:
+        parser.error("--data and --sqlite cannot be combined")
+
+    if options.sqlite is not None:
+        from storage import SQLiteLibrary
+
+        with SQLiteLibrary(options.sqlite) as library:
+            if options.batch is None:
+                library.run_interactive()
+                return 0
+            from batch import run_batch
+            return 1 if run_batch(library, options.batch)['failed'] else 0
+
+    if options.batch is not None:
+        from batch import run_batch
+
+        if options.data is None:
+            report = run_batch(LibraryManagementSystem(), options.batch)
+        else:
+            from journal import Journal
+            with Journal(options.data) as journal:
+                report = run_batch(journal.load(), options.batch)
+        return 1 if report['failed'] else 0
+
+    if options.data is None:
+        LibraryManagementSystem().run_interactive()
+        return 0
+
+    from journal import Journal
+    with Journal(options.data) as journal:
+        journal.load(lazy=True).run_interactive()
+    return 0
+
 
 if __name__ == "__main__":
-    library = LibraryManagementSystem()
-    library.run_interactive()
\ No newline at end of file
+    sys.exit(main())
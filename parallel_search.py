@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import threading
+import zlib
+
+from operations import _NgramIndex
+
+
+# ---------------------------
+# Process-sharded title/author search
+# ---------------------------
+# Each worker process owns the title and author trigram indexes for the
+# ISBNs hashed to its shard. Catalog changes are queued per shard and sent
+# in one message before the next query, which is then fanned out to every
+# shard so the substring checks run on all cores at once.
+
+def _shard_worker(connection):
+    indexes = {'title': _NgramIndex(), 'author': _NgramIndex()}
+    while True:
+        message = connection.recv()
+        kind = message[0]
+        if kind == 'apply':
+            for isbn, title, author in message[1]:
+                if title is None and author is None:
+                    indexes['title'].remove(isbn)
+                    indexes['author'].remove(isbn)
+                if title is not None:
+                    indexes['title'].replace(isbn, title)
+                if author is not None:
+                    indexes['author'].replace(isbn, author)
+        elif kind == 'search':
+            connection.send(indexes[message[1]].search(message[2]))
+        elif kind == 'stop':
+            break
+    connection.close()
+
+
+class ShardedSearch:
+    def __init__(self, books, workers=None):
+        workers = workers or os.cpu_count() or 1
+        context = multiprocessing.get_context()
+        self._connections = []
+        self._processes = []
+        self._pending = [[] for _ in range(workers)]
+        self._lock = threading.Lock()
+
+        for _ in range(workers):
+            parent, child = context.Pipe()
+            process = context.Process(target=_shard_worker, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+        for isbn, book in books.items():
+            self._queue(isbn, book['title'], book['author'])
+
+    def _queue(self, isbn, title, author):
+        # (isbn, None, None) removes the ISBN; a None field is left unchanged
+        shard = zlib.crc32(isbn.encode('utf-8')) % len(self._connections)
+        self._pending[shard].append((isbn, title, author))
+
+    def on_mutation(self, op, record):
+        with self._lock:
+            if op == 'add_book':
+                self._queue(record['isbn'], record['title'], record['author'])
+            elif op == 'delete_book':
+                self._queue(record['isbn'], None, None)
+            elif op == 'update_book' and record['field'] == 'title':
+                self._queue(record['isbn'], record['value'], None)
+            elif op == 'update_book' and record['field'] == 'author':
+                self._queue(record['isbn'], None, record['value'])
+
+    def search(self, search_type, search_term):
+        # Returns the matching ISBNs of every shard, in no particular order
+        with self._lock:
+            for connection, pending in zip(self._connections, self._pending):
+                if pending:
+                    connection.send(('apply', pending))
+            self._pending = [[] for _ in self._connections]
+
+            for connection in self._connections:
+                connection.send(('search', search_type, search_term))
+            matches = []
+            for connection in self._connections:
+                matches.extend(connection.recv())
+            return matches
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.send(('stop',))
+                connection.close()
+            for process in self._processes:
+                process.join()
+            self._connections = []
+            self._processes = []
@@ -0,0 +1,213 @@
+import heapq
+import operator
+
+TEXT_FIELDS = ("title", "author")
+NUMBER_FIELDS = ("total_copies", "available_copies")
+SORT_FIELDS = ("isbn", "title", "author", "genre", "total_copies", "available_copies")
+COMPARISONS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+# ---------------------------
+# Multi-predicate book queries
+# ---------------------------
+# A query is a nested tuple (lists work too, e.g. from JSON):
+#   (field, op, value)             one predicate
+#   ("and", query, query, ...)     every sub-query matches
+#   ("or", query, query, ...)      at least one sub-query matches
+# Fields and operators:
+#   title, author                  contains, prefix, ==  (ignoring case)
+#   genre, isbn                    ==, !=, in
+#   total_copies, available_copies ==, !=, <, <=, >, >=
+#   available                      == True / False
+# The planner asks every predicate for the index that can produce a superset
+# of its matches and an estimate of that superset's size. An AND starts from
+# its cheapest indexed child, an OR from the union of its children when all
+# of them are indexed, and anything else is a full scan. The whole query is
+# then checked on each candidate only. Libraries without these in-memory
+# indexes set _indexed_queries to False and always scan.
+
+class _Predicate:
+    def __init__(self, field, op, value):
+        self.field = field
+        self.op = op
+        self.value = value
+
+        if field in TEXT_FIELDS:
+            if op not in ('contains', 'prefix', '=='):
+                raise ValueError(f"Invalid operator for {field}: {op}")
+            if not isinstance(value, str) or not value:
+                raise ValueError(f"{field} {op} needs a non-empty text")
+            self.value = term = value.lower()
+            read = operator.attrgetter(field)
+            if op == 'contains':
+                self.test = lambda isbn, book: term in read(book).lower()
+            elif op == 'prefix':
+                self.test = lambda isbn, book: read(book).lower().startswith(term)
+            else:
+                self.test = lambda isbn, book: read(book).lower() == term
+        elif field in ("genre", "isbn"):
+            if op not in ('==', '!=', 'in'):
+                raise ValueError(f"Invalid operator for {field}: {op}")
+            read = (lambda isbn, book: isbn) if field == "isbn" else (lambda isbn, book: book.genre)
+            if op == 'in':
+                self.value = options = frozenset(value)
+                self.test = lambda isbn, book: read(isbn, book) in options
+            else:
+                compare = COMPARISONS[op]
+                self.test = lambda isbn, book: compare(read(isbn, book), value)
+        elif field in NUMBER_FIELDS:
+            if op not in COMPARISONS:
+                raise ValueError(f"Invalid operator for {field}: {op}")
+            if not isinstance(value, int):
+                raise ValueError(f"{field} {op} needs a number")
+            compare, read = COMPARISONS[op], operator.attrgetter(field)
+            self.test = lambda isbn, book: compare(read(book), value)
+        elif field == "available":
+            if op != '==' or not isinstance(value, bool):
+                raise ValueError("available only supports == True or == False")
+            self.test = lambda isbn, book: (book.available_copies > 0) == value
+        else:
+            raise ValueError(f"Unknown field: {field}")
+
+    def access(self, library):
+        # (estimated candidates, description, fetch) or None without an index
+        if self.field in TEXT_FIELDS:
+            index = library._title_index if self.field == "title" else library._author_index
+            grams = index._grams(self.value)
+            if not grams:
+                return None
+            estimate = min(len(index._postings.get(gram, ())) for gram in grams)
+            return estimate, f"{self.field} trigram index", lambda: index.candidates(self.value)
+        if self.field == "genre" and self.op in ('==', 'in'):
+            genres = [self.value] if self.op == '==' else sorted(self.value)
+            postings = [library._genre_index.get(genre, {}) for genre in genres]
+            return (sum(len(keys) for keys in postings), "genre index",
+                    lambda: set().union(*postings))
+        if self.field == "isbn" and self.op in ('==', 'in'):
+            isbns = [self.value] if self.op == '==' else self.value
+            found = {isbn for isbn in isbns if isbn in library.books}
+            return len(found), "isbn lookup", lambda: found
+        return None
+
+    def describe(self):
+        value = sorted(self.value) if isinstance(self.value, frozenset) else self.value
+        return f"{self.field} {self.op} {value!r}"
+
+
+class _Combination:
+    def __init__(self, kind, children):
+        if not children:
+            raise ValueError(f"'{kind}' needs at least one sub-query")
+        self.kind = kind
+        self.children = children
+        tests = [child.test for child in children]
+
+        if kind == 'and':
+            def test(isbn, book):
+                for child_test in tests:
+                    if not child_test(isbn, book):
+                        return False
+                return True
+        else:
+            def test(isbn, book):
+                for child_test in tests:
+                    if child_test(isbn, book):
+                        return True
+                return False
+        self.test = test
+
+    def access(self, library):
+        paths = [child.access(library) for child in self.children]
+        if self.kind == 'and':
+            indexed = [path for path in paths if path is not None]
+            return min(indexed, key=lambda path: path[0]) if indexed else None
+
+        if any(path is None for path in paths):
+            return None
+        fetches = [path[2] for path in paths]
+        return (sum(path[0] for path in paths),
+                "union of " + ", ".join(path[1] for path in paths),
+                lambda: set().union(*(fetch() for fetch in fetches)))
+
+    def describe(self):
+        joiner = f" {self.kind.upper()} "
+        return "(" + joiner.join(child.describe() for child in self.children) + ")"
+
+
+def compile_query(where):
+    if not isinstance(where, (tuple, list)) or not where:
+        raise ValueError(f"Invalid query: {where!r}")
+    if where[0] in ('and', 'or'):
+        return _Combination(where[0], [compile_query(child) for child in where[1:]])
+    if len(where) != 3:
+        raise ValueError(f"Predicates are (field, op, value), got: {where!r}")
+    return _Predicate(*where)
+
+
+def _check_order(sort_by):
+    if sort_by is not None and sort_by not in SORT_FIELDS:
+        raise ValueError(f"Invalid sort field! Use one of: {SORT_FIELDS}")
+
+
+def plan_query(library, where=None, sort_by=None, descending=False, limit=None):
+    # Returns (compiled query or None, access path or None, explain lines)
+    _check_order(sort_by)
+    query = compile_query(where) if where is not None else None
+    access = query.access(library) if query is not None and library._indexed_queries else None
+
+    if access is None:
+        lines = [f"access: full scan of {len(library.books):,} books"]
+    else:
+        lines = [f"access: {access[1]} (~{access[0]:,} candidates)"]
+    if query is not None:
+        lines.append(f"filter: {query.describe()}")
+    order = f"{sort_by} {'descending' if descending else 'ascending'}" if sort_by else "catalog order"
+    if limit is None:
+        lines.append(f"order: {order}, all rows")
+    elif sort_by is None and access is None:
+        lines.append(f"order: {order}, stop after {limit} rows")
+    else:
+        lines.append(f"order: {order}, top {limit} via heap")
+    return query, access, lines
+
+
+def run_query(library, where=None, sort_by=None, descending=False, limit=None):
+    # Returns the matching (isbn, book) pairs
+    query, access, _ = plan_query(library, where, sort_by, descending, limit)
+    books = library.books
+    order = library._book_order
+
+    if access is None:
+        rows = ((isbn, book) for isbn, book in books.items())
+        if query is not None:
+            rows = ((isbn, book) for isbn, book in rows if query.test(isbn, book))
+        if sort_by is None:
+            # A full scan already runs in catalog order
+            return [row for _, row in zip(range(limit), rows)] if limit is not None else list(rows)
+    else:
+        rows = []
+        for isbn in access[2]():
+            book = books.get(isbn)
+            if book is not None and query.test(isbn, book):
+                rows.append((isbn, book))
+
+    if sort_by is None:
+        sort_key = lambda row: order[row[0]]
+    elif sort_by == "isbn":
+        sort_key = lambda row: row[0]
+    elif sort_by in NUMBER_FIELDS:
+        sort_key = lambda row: (getattr(row[1], sort_by), order[row[0]])
+    else:
+        sort_key = lambda row: (getattr(row[1], sort_by).lower(), order[row[0]])
+
+    if limit is None:
+        return sorted(rows, key=sort_key, reverse=descending)
+    pick = heapq.nlargest if descending else heapq.nsmallest
+    return pick(limit, rows, key=sort_key)
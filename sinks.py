@@ -0,0 +1,86 @@
+import sys
+from collections import deque
+
+EMOJIS = {
+    'success': "🎯",
+    'error': "🚫",
+    'info': "💡",
+    'warning': "⚠️ ",
+    'book': "📖",
+    'member': "👨‍💼",
+    'search': "🔎",
+    'update': "🔄",
+    'delete': "❌",
+    'borrow': "📚",
+    'return': "📥",
+}
+
+
+def format_message(kind, message, heading=False):
+    line = f"{EMOJIS[kind]} {message}"
+    return f"\n{line}\n" if heading else line
+
+
+# ---------------------------
+# Output sinks for LibraryManagementSystem messages
+# ---------------------------
+# A sink with enabled = False is never handed a message, so the library
+# skips formatting it altogether.
+
+class ConsoleSink:
+    enabled = True
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def emit(self, kind, message, heading=False):
+        print(format_message(kind, message, heading), file=self.stream or sys.stdout)
+
+
+class NullSink:
+    enabled = False
+
+    def emit(self, kind, message, heading=False):
+        pass
+
+
+class BufferedSink:
+    enabled = True
+
+    def __init__(self, stream=None, max_lines=1000):
+        self.stream = stream
+        self.max_lines = max_lines
+        self._lines = []
+
+    def emit(self, kind, message, heading=False):
+        self._lines.append(format_message(kind, message, heading))
+        if len(self._lines) >= self.max_lines:
+            self.flush()
+
+    def flush(self):
+        if self._lines:
+            stream = self.stream or sys.stdout
+            stream.write("\n".join(self._lines) + "\n")
+            stream.flush()
+            self._lines = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+
+class EventSink:
+    enabled = True
+
+    def __init__(self, callback=None, maxlen=None):
+        self.callback = callback
+        self.events = deque(maxlen=maxlen)
+
+    def emit(self, kind, message, heading=False):
+        event = {'kind': kind, 'message': message, 'heading': heading}
+        if self.callback:
+            self.callback(event)
+        else:
+            self.events.append(event)
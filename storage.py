@@ -0,0 +1,713 @@
+import heapq
+import sqlite3
+from collections.abc import ItemsView, Mapping, ValuesView
+from contextlib import contextmanager
+
+from operations import FUZZY_CANDIDATES, LibraryManagementSystem
+from records import Book, Member
+
+BACKENDS = ("memory", "sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    seq INTEGER PRIMARY KEY,
+    isbn TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    genre TEXT NOT NULL,
+    genre_seq INTEGER NOT NULL,
+    total_copies INTEGER NOT NULL,
+    available_copies INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS books_by_genre ON books (genre, genre_seq);
+CREATE INDEX IF NOT EXISTS books_by_title ON books (py_lower(title));
+CREATE INDEX IF NOT EXISTS books_by_author ON books (py_lower(author));
+
+CREATE TABLE IF NOT EXISTS members (
+    seq INTEGER PRIMARY KEY,
+    member_id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL UNIQUE,
+    loaned_since INTEGER
+);
+CREATE INDEX IF NOT EXISTS members_with_loans ON members (loaned_since) WHERE loaned_since IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS loans (
+    seq INTEGER PRIMARY KEY,
+    member_id TEXT NOT NULL,
+    isbn TEXT NOT NULL,
+    UNIQUE (member_id, isbn)
+);
+CREATE INDEX IF NOT EXISTS loans_by_isbn ON loans (isbn);
+
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS books_text USING fts5(
+    title, author, content='', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS books_text_insert AFTER INSERT ON books BEGIN
+    INSERT INTO books_text (rowid, title, author) VALUES (new.seq, py_lower(new.title), py_lower(new.author));
+END;
+CREATE TRIGGER IF NOT EXISTS books_text_delete AFTER DELETE ON books BEGIN
+    INSERT INTO books_text (books_text, rowid, title, author)
+    VALUES ('delete', old.seq, py_lower(old.title), py_lower(old.author));
+END;
+CREATE TRIGGER IF NOT EXISTS books_text_update AFTER UPDATE OF title, author ON books BEGIN
+    INSERT INTO books_text (books_text, rowid, title, author)
+    VALUES ('delete', old.seq, py_lower(old.title), py_lower(old.author));
+    INSERT INTO books_text (rowid, title, author) VALUES (new.seq, py_lower(new.title), py_lower(new.author));
+END;
+"""
+
+BOOK_COLUMNS = "title, author, genre, total_copies, available_copies"
+MEMBER_COLUMNS = "member_id, name, email"
+
+# sort_key -> SQL for the first element of a listing cursor. py_lower() is
+# Python's str.lower, registered on every connection, so the order matches
+# the in-memory listings exactly; the triggers and indexes use it too.
+BOOK_ORDERS = {None: "seq", "isbn": "isbn", "title": "py_lower(title)",
+               "author": "py_lower(author)", "genre": "py_lower(genre)"}
+MEMBER_ORDERS = {None: "seq", "member_id": "member_id", "name": "py_lower(name)", "email": "py_lower(email)"}
+
+
+def open_library(backend="memory", path=":memory:", sink=None, **options):
+    # The same LibraryManagementSystem API over either storage backend
+    if backend == "memory":
+        return LibraryManagementSystem(sink, **options)
+    if backend == "sqlite":
+        return SQLiteLibrary(path, sink, **options)
+    raise ValueError(f"Unknown backend! Use one of: {BACKENDS}")
+
+
+# ---------------------------
+# SQLite storage backend
+# ---------------------------
+# Keeps books, members and loans in SQLite tables instead of dicts, so the
+# catalog does not have to fit in memory. The public operations are the
+# inherited ones: they read records through Mapping views over the tables
+# (self.books, self._members_by_id, self._members_by_email) and change
+# them through the storage helpers overridden below, so every validation,
+# message and return value stays the same as in memory.
+#
+# Each guarded operation runs in a savepoint and the surrounding
+# transaction is committed every commit_every operations (and by flush()
+# and close()), as the journal groups its fsyncs. While an operation runs,
+# every record it loads is kept in an identity map, so the objects the
+# inherited code holds see its own changes just like the live in-memory
+# records do. Statements are fixed SQL strings, which sqlite3 prepares
+# once and caches per connection.
+#
+# Fuzzy search and Tab completion run through the inherited methods on
+# stand-ins for the trigram and prefix indexes that query the tables, and
+# query_books() checks every book in a full scan, as the planner does when
+# no index applies. Parallel search needs the whole catalog in memory and
+# is not available.
+
+class SQLiteLibrary(LibraryManagementSystem):
+    # No planner access paths: query_books() always scans
+    _indexed_queries = False
+
+    def __init__(self, path=":memory:", sink=None, commit_every=64):
+        super().__init__(sink, search_cache_size=0)
+        self.path = path
+        self.commit_every = commit_every
+        self._connection = sqlite3.connect(path, isolation_level=None, cached_statements=256)
+        self._connection.create_function("py_lower", 1, str.lower, deterministic=True)
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.executescript(SCHEMA)
+        self._depth = 0
+        self._pending = 0
+        self._objects = {}
+
+        self.books = _BookTable(self)
+        self._book_order = _BookOrder(self)
+        self._members_by_id = _MemberTable(self)
+        self._members_by_email = _EmailTable(self)
+        self._title_index = _TextSearch(self, "title")
+        self._author_index = _TextSearch(self, "author")
+        self._prefixes = {'title': _Completions(self, "title"), 'author': _Completions(self, "author")}
+
+        execute = self._connection.execute
+        self._next_book_order = execute("SELECT coalesce(max(seq), -1) + 1 FROM books").fetchone()[0]
+        self._next_member_order = execute("SELECT coalesce(max(seq), -1) + 1 FROM members").fetchone()[0]
+        self._next_genre_order = execute("SELECT coalesce(max(genre_seq), -1) + 1 FROM books").fetchone()[0]
+        self._next_loan = execute("SELECT coalesce(max(seq), -1) + 1 FROM loans").fetchone()[0]
+        row = execute("SELECT value FROM settings WHERE name = 'next_member_id'").fetchone()
+        self.next_member_id = row[0] if row else 1
+
+    @classmethod
+    def from_state(cls, state, sink=None):
+        raise NotImplementedError("Use SQLiteLibrary(path).restore_state(state) instead")
+
+    @classmethod
+    def from_loader(cls, loader, sink=None, lazy=False, concurrent=False):
+        raise NotImplementedError("The SQLite backend opens its database directly")
+
+    def flush(self):
+        if self._connection.in_transaction:
+            self._connection.execute("COMMIT")
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def _guard(self, *keys, catalog=False, roster=False):
+        if self._depth:
+            yield
+            return
+        connection = self._connection
+        if not connection.in_transaction:
+            connection.execute("BEGIN")
+        connection.execute("SAVEPOINT operation")
+        self._depth = 1
+        try:
+            yield
+        except BaseException:
+            connection.execute("ROLLBACK TO operation")
+            connection.execute("RELEASE operation")
+            raise
+        else:
+            connection.execute("RELEASE operation")
+        finally:
+            self._depth = 0
+            self._objects.clear()
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.flush()
+
+    # ---------------------------
+    # Loading records
+    # ---------------------------
+
+    def _load_book(self, isbn):
+        # Raises KeyError for an unknown ISBN
+        book = self._objects.get(('book', isbn))
+        if book is None:
+            row = self._connection.execute(f"SELECT {BOOK_COLUMNS} FROM books WHERE isbn = ?", (isbn,)).fetchone()
+            if row is None:
+                raise KeyError(isbn)
+            book = Book(*row)
+            if self._depth:
+                self._objects[('book', isbn)] = book
+        return book
+
+    def _load_member(self, member_id):
+        # Raises KeyError for an unknown member ID
+        member = self._objects.get(('member', member_id))
+        if member is None:
+            execute = self._connection.execute
+            row = execute(f"SELECT {MEMBER_COLUMNS} FROM members WHERE member_id = ?", (member_id,)).fetchone()
+            if row is None:
+                raise KeyError(member_id)
+            loans = execute("SELECT isbn FROM loans WHERE member_id = ? ORDER BY seq", (member_id,))
+            member = Member(*row, [isbn for isbn, in loans])
+            if self._depth:
+                self._objects[('member', member_id)] = member
+        return member
+
+    def _members(self, rows):
+        # Member records for (member_id, name, email) rows, with their loans
+        rows = list(rows)
+        loans = {}
+        for start in range(0, len(rows), 500):
+            member_ids = [row[0] for row in rows[start:start + 500]]
+            placeholders = ", ".join("?" * len(member_ids))
+            for member_id, isbn in self._connection.execute(
+                    f"SELECT member_id, isbn FROM loans WHERE member_id IN ({placeholders}) ORDER BY seq",
+                    member_ids):
+                loans.setdefault(member_id, []).append(isbn)
+        return [Member(*row, loans.get(row[0])) for row in rows]
+
+    # ---------------------------
+    # Storage helpers
+    # ---------------------------
+
+    def _insert_book(self, isbn, title, author, genre, total_copies):
+        self._connection.execute(
+            "INSERT INTO books (seq, isbn, title, author, genre, genre_seq, total_copies, available_copies) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self._next_book_order, isbn, title, author, genre, self._next_genre_order, total_copies, total_copies))
+        self._next_book_order += 1
+        self._next_genre_order += 1
+
+    def _insert_member(self, name, email, member_id=None):
+        if member_id is None:
+            member_id = self._new_member_id()
+            self.next_member_id += 1
+            self._connection.execute("INSERT OR REPLACE INTO settings (name, value) VALUES ('next_member_id', ?)",
+                                     (self.next_member_id,))
+
+        self._connection.execute("INSERT INTO members (seq, member_id, name, email) VALUES (?, ?, ?, ?)",
+                                 (self._next_member_order, member_id, name, email))
+        self._next_member_order += 1
+        return member_id
+
+    def _set_book_field(self, isbn, field, value):
+        book = self.books[isbn]
+        execute = self._connection.execute
+        if field == "total_copies":
+            book.available_copies = max(0, value - (book.total_copies - book.available_copies))
+            book.total_copies = value
+            execute("UPDATE books SET total_copies = ?, available_copies = ? WHERE isbn = ?",
+                    (value, book.available_copies, isbn))
+        elif field == "genre":
+            book.genre = value
+            execute("UPDATE books SET genre = ?, genre_seq = ? WHERE isbn = ?", (value, self._next_genre_order, isbn))
+            self._next_genre_order += 1
+        elif field == "title":
+            book.title = value
+            execute("UPDATE books SET title = ? WHERE isbn = ?", (value, isbn))
+        elif field == "author":
+            book.author = value
+            execute("UPDATE books SET author = ? WHERE isbn = ?", (value, isbn))
+
+    def _set_member_field(self, member_id, field, value):
+        member = self._members_by_id[member_id]
+        if field == "name":
+            self._connection.execute("UPDATE members SET name = ? WHERE member_id = ?", (value, member_id))
+        elif field == "email":
+            self._connection.execute("UPDATE members SET email = ? WHERE member_id = ?", (value, member_id))
+        setattr(member, field, value)
+
+    def _remove_book(self, isbn):
+        self._connection.execute("DELETE FROM books WHERE isbn = ?", (isbn,))
+        self._objects.pop(('book', isbn), None)
+
+    def _remove_member(self, member_id):
+        self._connection.execute("DELETE FROM members WHERE member_id = ?", (member_id,))
+        self._objects.pop(('member', member_id), None)
+
+    def _link_loan(self, member, isbn):
+        # Callers take the copy off the book record; the row is updated here
+        execute = self._connection.execute
+        if not member.borrowed_books:
+            execute("UPDATE members SET loaned_since = ? WHERE member_id = ?", (self._next_loan, member.member_id))
+        member.borrowed_books.add(isbn)
+        execute("INSERT INTO loans (seq, member_id, isbn) VALUES (?, ?, ?)", (self._next_loan, member.member_id, isbn))
+        execute("UPDATE books SET available_copies = available_copies - 1 WHERE isbn = ?", (isbn,))
+        self._next_loan += 1
+
+    def _unlink_loan(self, member, isbn):
+        execute = self._connection.execute
+        member.borrowed_books.remove(isbn)
+        execute("DELETE FROM loans WHERE member_id = ? AND isbn = ?", (member.member_id, isbn))
+        execute("UPDATE books SET available_copies = available_copies + 1 WHERE isbn = ?", (isbn,))
+        if not member.borrowed_books:
+            execute("UPDATE members SET loaned_since = NULL WHERE member_id = ?", (member.member_id,))
+
+    def _count_copies(self, genre, titles, total_copies, available_copies):
+        # genre_stats() sums the books table instead
+        pass
+
+    def _count_available(self, genre, delta):
+        pass
+
+    def restore_state(self, state):
+        # Bulk load of export_state() output into an empty database, in one
+        # transaction
+        with self._guard():
+            execute = self._connection.execute
+            books = [(self._next_book_order + index, book['isbn'], book['title'], book['author'], book['genre'],
+                      self._next_genre_order + index, book['total_copies'], book['available_copies'])
+                     for index, book in enumerate(state['books'])]
+            self._connection.executemany(
+                "INSERT INTO books (seq, isbn, title, author, genre, genre_seq, total_copies, available_copies) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", books)
+            self._next_book_order += len(books)
+            self._next_genre_order += len(books)
+
+            members = [(order, member['member_id'], member['name'], member['email'])
+                       for order, member in enumerate(state['members'], start=self._next_member_order)]
+            self._connection.executemany("INSERT INTO members (seq, member_id, name, email) VALUES (?, ?, ?, ?)",
+                                         members)
+            self._next_member_order += len(members)
+
+            loans = []
+            for member in state['members']:
+                if member['borrowed_books']:
+                    execute("UPDATE members SET loaned_since = ? WHERE member_id = ?",
+                            (self._next_loan + len(loans), member['member_id']))
+                for isbn in member['borrowed_books']:
+                    loans.append((self._next_loan + len(loans), member['member_id'], isbn))
+            self._connection.executemany("INSERT INTO loans (seq, member_id, isbn) VALUES (?, ?, ?)", loans)
+            self._next_loan += len(loans)
+
+            self.next_member_id = state['next_member_id']
+            execute("INSERT OR REPLACE INTO settings (name, value) VALUES ('next_member_id', ?)",
+                    (self.next_member_id,))
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+
+    def search_books(self, search_type, search_term):
+        self._print_search("SEARCHING LIBRARY CATALOG", heading=True)
+
+        error = self._validate_search(search_type, search_term)
+        if error:
+            self._print_error(*error)
+            return False, []
+
+        search_term = search_term.lower()
+        results = [(isbn, book) for _, isbn, book in self._search_rows(search_type, search_term)]
+
+        if results:
+            self._print_success("Found {} book(s) matching '{}'", len(results), search_term)
+        else:
+            self._print_info("No books found matching your search")
+
+        return True, results
+
+    def page_search(self, search_type, search_term, cursor=None, limit=None):
+        error = self._validate_search(search_type, search_term)
+        if error:
+            self._print_error(*error)
+            return False, [], None
+
+        limit = limit or self.page_size
+        page = []
+        for order, isbn, book in self._search_rows(search_type, search_term.lower(), cursor):
+            if len(page) == limit:
+                return True, page, (last_order, page[-1][0])
+            page.append((isbn, book))
+            last_order = order
+        return True, page, None
+
+    def _search_rows(self, search_type, term, cursor=None):
+        # Yields (catalog order, isbn, book) for books whose title or author
+        # contains the lowercase term, in catalog order. The trigram FTS
+        # table, which indexes the str.lower() texts, narrows terms of three
+        # or more characters down; its own case folding maps one character
+        # at a time, so it never drops a match. Every row is still checked
+        # with str.lower(), so matches equal the in-memory ones.
+        after = tuple(cursor) if cursor is not None else (-1, "")
+        if len(term) >= 3:
+            phrase = '"' + term.replace('"', '""') + '"'
+            rows = self._connection.execute(
+                "SELECT b.seq, b.isbn, b.title, b.author, b.genre, b.total_copies, b.available_copies "
+                "FROM books_text JOIN books b ON b.seq = books_text.rowid "
+                "WHERE books_text MATCH ? AND (b.seq, b.isbn) > (?, ?) ORDER BY b.seq",
+                (f"{search_type} : {phrase}", *after))
+        else:
+            rows = self._connection.execute(
+                f"SELECT seq, isbn, {BOOK_COLUMNS} FROM books WHERE (seq, isbn) > (?, ?) ORDER BY seq", after)
+
+        field = 2 if search_type == "title" else 3
+        for row in rows:
+            if term in row[field].lower():
+                yield row[0], row[1], Book(*row[2:])
+
+    def books_by_genre(self, genre):
+        rows = self._connection.execute(
+            f"SELECT isbn, {BOOK_COLUMNS} FROM books WHERE genre = ? ORDER BY genre_seq", (genre,))
+        return [(row[0], Book(*row[1:])) for row in rows]
+
+    def genre_stats(self):
+        stats = {genre: {'titles': 0, 'total_copies': 0, 'available_copies': 0} for genre in self.valid_genres}
+        for genre, titles, total_copies, available_copies in self._connection.execute(
+                "SELECT genre, count(*), sum(total_copies), sum(available_copies) FROM books GROUP BY genre"):
+            stats[genre] = {'titles': titles, 'total_copies': total_copies, 'available_copies': available_copies}
+        return stats
+
+    def current_borrowers(self, isbn):
+        rows = self._connection.execute("SELECT member_id FROM loans WHERE isbn = ? ORDER BY seq", (isbn,))
+        return [self._load_member(member_id) for member_id, in rows]
+
+    def members_with_loans(self):
+        return self._members(self._connection.execute(
+            f"SELECT {MEMBER_COLUMNS} FROM members WHERE loaned_since IS NOT NULL ORDER BY loaned_since"))
+
+    def check_loans(self):
+        self._print_info("CHECKING LOAN RECORDS", heading=True)
+
+        execute = self._connection.execute
+        problems = []
+        with self._guard():
+            for member_id, in execute(
+                    "SELECT member_id FROM members m WHERE (loaned_since IS NOT NULL) != "
+                    "EXISTS (SELECT 1 FROM loans l WHERE l.member_id = m.member_id) ORDER BY seq"):
+                problems.append(f"Member '{member_id}' is misfiled in the members with loans")
+
+            for isbn, in execute("SELECT DISTINCT isbn FROM loans WHERE isbn NOT IN (SELECT isbn FROM books)"):
+                problems.append(f"Book '{isbn}' is on loan but not in the catalog")
+
+            for isbn, available, on_loan, total in execute(
+                    "SELECT b.isbn, b.available_copies, count(l.isbn), b.total_copies "
+                    "FROM books b LEFT JOIN loans l ON l.isbn = b.isbn GROUP BY b.seq "
+                    "HAVING b.available_copies != max(0, b.total_copies - count(l.isbn)) ORDER BY b.seq"):
+                problems.append(f"Book '{isbn}' has {available} available copies "
+                                f"but {on_loan} of {total} on loan")
+
+        for problem in problems:
+            self._print_warning(problem)
+        if not problems:
+            self._print_success("All loan records are consistent!")
+        return problems
+
+    # ---------------------------
+    # Paginated listings
+    # ---------------------------
+    # Keyset pagination with the same cursors as in memory: (catalog or
+    # registration order, key) by default, else (sort value, key).
+
+    def _ordered(self, orders, sort_key, sort_keys):
+        if sort_key is not None and sort_key not in sort_keys:
+            raise ValueError(f"Invalid sort key! Use one of: {sort_keys}")
+        return orders[sort_key]
+
+    def _select_books(self, cursor, offset, limit, sort_key):
+        order = self._ordered(BOOK_ORDERS, sort_key, ("isbn", "title", "author", "genre"))
+        where = f"WHERE ({order}, isbn) > (?, ?)" if cursor is not None else ""
+        return self._connection.execute(
+            f"SELECT {order}, isbn, {BOOK_COLUMNS} FROM books {where} ORDER BY {order}, isbn LIMIT ? OFFSET ?",
+            (*(cursor or ()), -1 if limit is None else limit, offset))
+
+    def _select_members(self, cursor, offset, limit, sort_key):
+        order = self._ordered(MEMBER_ORDERS, sort_key, ("member_id", "name", "email"))
+        where = f"WHERE ({order}, member_id) > (?, ?)" if cursor is not None else ""
+        return self._connection.execute(
+            f"SELECT {order}, {MEMBER_COLUMNS} FROM members {where} ORDER BY {order}, member_id LIMIT ? OFFSET ?",
+            (*(cursor or ()), -1 if limit is None else limit, offset))
+
+    def iter_books(self, cursor=None, offset=0, limit=None, sort_key=None):
+        for row in self._select_books(cursor, offset, limit, sort_key):
+            yield row[1], Book(*row[2:])
+
+    def iter_members(self, cursor=None, offset=0, limit=None, sort_key=None):
+        rows = self._select_members(cursor, offset, limit, sort_key)
+        while True:
+            chunk = rows.fetchmany(500)
+            if not chunk:
+                return
+            yield from self._members(row[1:] for row in chunk)
+
+    def page_books(self, cursor=None, limit=None, sort_key=None):
+        limit = limit or self.page_size
+        rows = self._select_books(cursor, 0, limit + 1, sort_key).fetchall()
+        page = [(row[1], Book(*row[2:])) for row in rows[:limit]]
+        return page, (rows[limit - 1][0], rows[limit - 1][1]) if len(rows) > limit else None
+
+    def page_members(self, cursor=None, limit=None, sort_key=None):
+        limit = limit or self.page_size
+        rows = self._select_members(cursor, 0, limit + 1, sort_key).fetchall()
+        page = self._members(row[1:] for row in rows[:limit])
+        return page, (rows[limit - 1][0], rows[limit - 1][1]) if len(rows) > limit else None
+
+    def enable_parallel_search(self, workers=None, threshold=100_000):
+        raise NotImplementedError("Parallel search needs the in-memory catalog")
+
+
+# ---------------------------
+# Index stand-ins
+# ---------------------------
+
+class _TextSearch:
+    # Serves fuzzy_search_books() like _NgramIndex.similar(): the same
+    # trigram Jaccard scores and candidate budget, with ties in catalog
+    # order. Grams are visited rarest first through the FTS table and each
+    # one's books in catalog order, so the budget picks the same books as
+    # in memory. Without the in-memory score bound the walk goes on until
+    # the grams or the budget run out; the books it scores past that bound
+    # cannot enter the top results.
+    def __init__(self, library, field):
+        self._library = library
+        self._field = field
+        self.n = 3
+
+    def _grams(self, text):
+        n = self.n
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def similar(self, term, limit, min_score, order, max_candidates=FUZZY_CANDIDATES):
+        grams = tuple(self._grams(term.lower()))
+        if not grams or limit <= 0:
+            return []
+
+        execute = self._library._connection.execute
+        field = self._field
+        phrases = {gram: f'{field} : "' + gram.replace('"', '""') + '"' for gram in grams}
+        counts = {gram: execute("SELECT count(*) FROM books_text WHERE books_text MATCH ?",
+                                (phrases[gram],)).fetchone()[0] for gram in grams}
+
+        scored = []
+        seen = set()
+        budget = max_candidates
+        for gram in sorted(grams, key=lambda gram: (counts[gram], gram)):
+            rows = execute(f"SELECT b.seq, b.isbn, b.{field} FROM books_text JOIN books b "
+                           "ON b.seq = books_text.rowid WHERE books_text MATCH ? ORDER BY b.seq",
+                           (phrases[gram],))
+            for seq, isbn, text in rows:
+                text = text.lower()
+                if isbn in seen or gram not in text:
+                    continue
+                seen.add(isbn)
+                common = sum(map(text.__contains__, grams))
+                score = common / (len(grams) + len(text) - self.n + 1 - common)
+                if score >= min_score:
+                    scored.append((score, -seq, isbn))
+                budget -= 1
+                if not budget:
+                    break
+            if not budget:
+                break
+        return [(score, isbn) for score, _, isbn in heapq.nlargest(limit, scored)]
+
+
+class _Completions:
+    # Serves suggest() like _PrefixIndex.complete() with a range scan of the
+    # py_lower(title) / py_lower(author) index; each distinct text is
+    # spelled as in the earliest book that has it
+    def __init__(self, library, field):
+        self._library = library
+        self._field = field
+
+    def complete(self, prefix, limit):
+        prefix = prefix.lower()
+        field = self._field
+        found = []
+        last = None
+        for key, text in self._library._connection.execute(
+                f"SELECT py_lower({field}), {field} FROM books WHERE py_lower({field}) >= ? "
+                f"ORDER BY py_lower({field}), seq", (prefix,)):
+            if not key.startswith(prefix):
+                break
+            if key != last:
+                if len(found) == limit:
+                    break
+                found.append(text)
+                last = key
+        return found
+
+
+# ---------------------------
+# Mapping views over the tables
+# ---------------------------
+
+class _BookTable(Mapping):
+    # ISBN -> book, in catalog order
+    def __init__(self, library):
+        self._library = library
+
+    def __getitem__(self, isbn):
+        return self._library._load_book(isbn)
+
+    def __contains__(self, isbn):
+        return self._library._connection.execute("SELECT 1 FROM books WHERE isbn = ?", (isbn,)).fetchone() is not None
+
+    def __iter__(self):
+        for isbn, in self._library._connection.execute("SELECT isbn FROM books ORDER BY seq"):
+            yield isbn
+
+    def __len__(self):
+        return self._library._connection.execute("SELECT count(*) FROM books").fetchone()[0]
+
+    def items(self):
+        return _BookItems(self)
+
+    def values(self):
+        return _BookValues(self)
+
+
+class _BookItems(ItemsView):
+    def __iter__(self):
+        return self._mapping._library.iter_books()
+
+
+class _BookValues(ValuesView):
+    def __iter__(self):
+        for isbn, book in self._mapping._library.iter_books():
+            yield book
+
+
+class _BookOrder(Mapping):
+    # ISBN -> catalog position, for the tie-breaks of sorted queries
+    def __init__(self, library):
+        self._library = library
+
+    def __getitem__(self, isbn):
+        row = self._library._connection.execute("SELECT seq FROM books WHERE isbn = ?", (isbn,)).fetchone()
+        if row is None:
+            raise KeyError(isbn)
+        return row[0]
+
+    def __iter__(self):
+        return iter(self._library.books)
+
+    def __len__(self):
+        return len(self._library.books)
+
+
+class _MemberTable(Mapping):
+    # member_id -> member, in registration order
+    def __init__(self, library):
+        self._library = library
+
+    def __getitem__(self, member_id):
+        return self._library._load_member(member_id)
+
+    def __contains__(self, member_id):
+        return self._library._connection.execute(
+            "SELECT 1 FROM members WHERE member_id = ?", (member_id,)).fetchone() is not None
+
+    def __iter__(self):
+        for member_id, in self._library._connection.execute("SELECT member_id FROM members ORDER BY seq"):
+            yield member_id
+
+    def __len__(self):
+        return self._library._connection.execute("SELECT count(*) FROM members").fetchone()[0]
+
+    def items(self):
+        return _MemberItems(self)
+
+    def values(self):
+        return _MemberValues(self)
+
+
+class _MemberItems(ItemsView):
+    def __iter__(self):
+        for member in self._mapping._library.iter_members():
+            yield member.member_id, member
+
+
+class _MemberValues(ValuesView):
+    def __iter__(self):
+        return self._mapping._library.iter_members()
+
+
+class _EmailTable(Mapping):
+    # email -> member
+    def __init__(self, library):
+        self._library = library
+
+    def _member_id(self, email):
+        row = self._library._connection.execute("SELECT member_id FROM members WHERE email = ?", (email,)).fetchone()
+        return row[0] if row else None
+
+    def __getitem__(self, email):
+        member_id = self._member_id(email)
+        if member_id is None:
+            raise KeyError(email)
+        return self._library._load_member(member_id)
+
+    def __contains__(self, email):
+        return self._member_id(email) is not None
+
+    def __iter__(self):
+        for email, in self._library._connection.execute("SELECT email FROM members ORDER BY seq"):
+            yield email
+
+    def __len__(self):
+        return self._library._connection.execute("SELECT count(*) FROM members").fetchone()[0]
@@ -1,4 +1,25 @@
+import io
+import asyncio
+import builtins
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
+
+from batch import run_batch
+from benchmarks import compare, run_benchmarks
+from catalog_file import MappedCatalog, write_catalog
+from journal import Journal
+from render import Renderer
+from service import LibraryClient, LibraryService
+import operations
 from operations import LibraryManagementSystem
+from sinks import BufferedSink, EventSink, NullSink
+from storage import SQLiteLibrary, open_library
 
 
 class TestLibraryManagementSystem:
@@ -173,6 +194,1079 @@ class TestLibraryManagementSystem:
         success = self.library.delete_member(self.member_id)
         assert success == False
 
+    def test_update_member_email_reindexes(self):
+        """Test that a changed email frees the old one and blocks the new one in Library"""
+        success = self.library.update_member(self.member_id, "email", "changed@email.com")
+        assert success == True
+
+        assert self.library.add_member("Someone Else", "changed@email.com") == False
+        assert self.library.add_member("Someone Else", "test@email.com") == True
+
+    def test_delete_member_removes_lookup(self):
+        """Test that a deleted member can no longer be found in Library"""
+        self.library.delete_member(self.member_id)
+        assert self.library.get_member_details(self.member_id) is None
+        assert self.library.borrow_book(self.member_id, "LIB-001") == False
+        assert self.library.add_member("Test Member", "test@email.com") == True
+
+    def test_search_books_follows_updates_and_deletes(self):
+        """Test that title/author searches reflect updates and deletions in Library"""
+        self.library.update_book("LIB-001", "title", "Renamed Volume")
+        self.library.update_book("LIB-002", "author", "Someone Else")
+        self.library.delete_book("LIB-002")
+        self.library.add_book("LIB-003", "Another Volume", "Author Three", "Thriller", 1)
+
+        success, results = self.library.search_books("title", "Test Book")
+        assert success == True
+        assert results == []
+
+        success, results = self.library.search_books("title", "volume")
+        assert [isbn for isbn, book in results] == ["LIB-001", "LIB-003"]
+
+        success, results = self.library.search_books("author", "else")
+        assert results == []
+
+    def test_search_books_matches_full_scan(self):
+        """Test that indexed search returns the same list as a catalog scan in Library"""
+        self.library.add_book("LIB-003", "A", "Ab", "Thriller", 1)
+        self.library.add_book("LIB-004", "Book of Books", "Author Onex", "Fantasy", 1)
+        for term in ["a", "Bo", "book", "OOK OF", "or o", "zzz", "Author One"]:
+            for field in ["title", "author"]:
+                expected = [(isbn, book) for isbn, book in self.library.get_all_books().items()
+                            if term.lower() in book[field].lower()]
+                success, results = self.library.search_books(field, term)
+                assert results == expected
+
+    def test_import_books_reports_bad_rows(self):
+        """Test bulk importing books with per-row errors into Library"""
+        rows = [
+            {'isbn': "LIB-010", 'title': "Imported", 'author': "Bulk Author", 'genre': "Fantasy", 'total_copies': "2"},
+            {'isbn': "LIB-001", 'title': "Dup", 'author': "A", 'genre': "Fantasy", 'total_copies': 1},
+            {'isbn': "LIB-011", 'title': "Bad Genre", 'author': "A", 'genre': "Poetry", 'total_copies': 1},
+            {'isbn': "LIB-012", 'title': "Bad Copies", 'author': "A", 'genre': "Fantasy", 'total_copies': "x"},
+            {'isbn': "LIB-010", 'title': "Again", 'author': "A", 'genre': "Fantasy", 'total_copies': 1},
+            {'isbn': "LIB-013", 'title': "No Author", 'genre': "Fantasy", 'total_copies': 1},
+        ]
+        report = self.library.import_books(iter(rows), batch_size=2)
+        assert report['imported'] == 1
+        assert report['failed'] == 5
+        assert [row for row, message in report['errors']] == [2, 3, 4, 5, 6]
+        assert self.library.get_book_details("LIB-010")['total_copies'] == 2
+
+        success, results = self.library.search_books("author", "bulk")
+        assert [isbn for isbn, book in results] == ["LIB-010"]
+
+    def test_import_from_csv_and_jsonl_files(self):
+        """Test bulk importing books from CSV and members from JSONL into Library"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            books_path = os.path.join(tmp_dir, "books.csv")
+            with open(books_path, "w") as f:
+                f.write("isbn,title,author,genre,total_copies\n")
+                f.write("LIB-020,Csv Book,Csv Author,Technology,4\n")
+
+            members_path = os.path.join(tmp_dir, "members.jsonl")
+            with open(members_path, "w") as f:
+                f.write(json.dumps({'name': "Jsonl Member", 'email': "jsonl@email.com"}) + "\n")
+                f.write("{not json}\n")
+                f.write(json.dumps({'name': "Duplicate", 'email': "test@email.com"}) + "\n")
+
+            report = self.library.import_books(books_path)
+            assert report == {'imported': 1, 'failed': 0, 'errors': []}
+            assert self.library.get_book_details("LIB-020")['available_copies'] == 4
+
+            report = self.library.import_members(members_path)
+            assert report['imported'] == 1
+            assert [row for row, message in report['errors']] == [2, 3]
+            assert len(self.library.get_all_members()) == 2
+
+    def test_null_sink_prints_nothing(self):
+        """Test that a null sink silences Library operations"""
+        self.library.sink = NullSink()
+        output = io.StringIO()
+        with redirect_stdout(output):
+            assert self.library.add_book("LIB-003", "Quiet Book", "Author", "Thriller", 1) == True
+            assert self.library.borrow_book(self.member_id, "LIB-404") == False
+        assert output.getvalue() == ""
+
+    def test_event_sink_records_structured_events(self):
+        """Test that an event sink receives formatted structured events from Library"""
+        sink = EventSink()
+        self.library.sink = sink
+        self.library.borrow_book(self.member_id, "LIB-404")
+        assert list(sink.events) == [
+            {'kind': 'borrow', 'message': "PROCESSING BOOK BORROWAL", 'heading': True},
+            {'kind': 'error', 'message': "Book with ISBN 'LIB-404' not found!", 'heading': False},
+        ]
+
+    def test_buffered_sink_writes_on_flush(self):
+        """Test that a buffered sink holds Library output until flushed"""
+        stream = io.StringIO()
+        sink = BufferedSink(stream)
+        self.library.sink = sink
+        self.library.delete_book("LIB-404")
+        assert stream.getvalue() == ""
+        sink.flush()
+        assert stream.getvalue() == "\n❌ REMOVING BOOK FROM LIBRARY\n\n🚫 Book with ISBN 'LIB-404' not found!\n"
+
+    def test_journal_recovers_state(self):
+        """Test that a journaled Library is rebuilt after a restart"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with Journal(tmp_dir, group_commit=2) as journal:
+                library = journal.load(sink=NullSink())
+                library.add_book("LIB-001", "Journal Book", "Author One", "Fantasy", 2)
+                library.add_member("Journal Member", "journal@email.com")
+                library.borrow_book("MEM001", "LIB-001")
+                library.update_book("LIB-001", "total_copies", "4")
+                library.update_member("MEM001", "email", "moved@email.com")
+                library.add_book("LIB-002", "Gone", "Author Two", "Thriller", 1)
+                library.delete_book("LIB-002")
+                expected = library.export_state()
+
+            recovered = Journal(tmp_dir).load(sink=NullSink())
+            assert recovered.export_state() == expected
+            assert recovered.get_book_details("LIB-001")['available_copies'] == 3
+            assert recovered.add_member("Reuse", "journal@email.com") == True
+            assert recovered.get_all_members()[-1]['member_id'] == "MEM002"
+
+    def test_journal_snapshot_compacts_and_ignores_torn_tail(self):
+        """Test that Library snapshots truncate the journal and a torn record is dropped"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with Journal(tmp_dir, snapshot_every=3) as journal:
+                library = journal.load(sink=NullSink())
+                for number in range(1, 5):
+                    library.add_book(f"LIB-00{number}", f"Book {number}", "Author", "Fantasy", 1)
+                expected = library.export_state()
+
+            assert len(journal._snapshots()) == 1
+            segments = journal._segments()
+            assert [start for start, path in segments] == [4]
+            with open(segments[0][1], "a") as f:
+                f.write('{"seq": 5, "op": "delete_bo')
+
+            recovered = Journal(tmp_dir).load(sink=NullSink())
+            assert recovered.export_state() == expected
+
+    def test_journal_snapshot_inside_a_batch_keeps_later_steps(self):
+        """Test that a Library batch crossing a snapshot boundary is recovered once"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with Journal(tmp_dir, snapshot_every=4) as journal:
+                library = journal.load(sink=NullSink())
+                library.add_book("A", "Batch Book A", "Author", "Fantasy", 4)
+                library.add_book("B", "Batch Book B", "Author", "Fantasy", 4)
+                library.add_member("Batch Member", "batch@email.com")
+                assert library.borrow_many("MEM001", ["A", "B"])
+                expected = library.export_state()
+            assert len(journal._snapshots()) == 1
+
+            recovered = Journal(tmp_dir).load(sink=NullSink())
+            assert recovered.export_state() == expected
+            assert recovered.get_book_details("B")['available_copies'] == 3
+            assert recovered.check_loans() == []
+
+    def test_journal_snapshots_concurrent_library_consistently(self):
+        """Test that snapshots of a concurrent journaled Library never count a change twice"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with Journal(tmp_dir, snapshot_every=25) as journal:
+                library = journal.load(sink=NullSink(), concurrent=True)
+                for number in range(8):
+                    library.add_book(f"B{number}", f"Busy Book {number}", "Author", "Fantasy", 2)
+                    library.add_member(f"Desk {number}", f"desk{number}@email.com")
+
+                # Yield to other threads between applying a change and journaling it
+                notify = library._notify
+
+                def slow_notify(op, **record):
+                    time.sleep(0.0002)
+                    notify(op, **record)
+
+                library._notify = slow_notify
+
+                def desk(number):
+                    member_id, isbn = f"MEM{number + 1:03d}", f"B{number}"
+                    for _ in range(60):
+                        library.borrow_book(member_id, isbn)
+                        library.return_book(member_id, isbn)
+                    library.borrow_book(member_id, isbn)
+
+                threads = [threading.Thread(target=desk, args=(number,)) for number in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                expected = library.export_state()
+            assert len(journal._snapshots()) == 1
+
+            recovered = Journal(tmp_dir).load(sink=NullSink())
+            assert recovered.export_state() == expected
+            assert recovered.check_loans() == []
+            assert all(book['available_copies'] == 1 for book in recovered.get_all_books().values())
+
+    def test_journal_orders_a_new_book_before_its_first_borrow(self):
+        """Test that a concurrent Library never journals a borrow before the book it borrows"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with Journal(tmp_dir) as journal:
+                library = journal.load(sink=NullSink(), concurrent=True)
+                library.add_member("Early Reader", "early@email.com")
+
+                # Stall the add after the book is stored but before it is journaled
+                index_add = library._title_index.add
+
+                def slow_add(key, text):
+                    time.sleep(0.05)
+                    index_add(key, text)
+
+                library._title_index.add = slow_add
+                adding = threading.Thread(target=library.add_book,
+                                          args=("A", "Fresh Arrival", "Author", "Fantasy", 1))
+                adding.start()
+                deadline = time.monotonic() + 5
+                while not library.borrow_book("MEM001", "A") and time.monotonic() < deadline:
+                    pass
+                adding.join()
+                expected = library.export_state()
+
+            recovered = Journal(tmp_dir).load(sink=NullSink())
+            assert recovered.export_state() == expected
+            assert recovered.get_member_details("MEM001")['borrowed_books'] == ["A"]
+
+    def test_journal_writes_records_and_syncs_when_idle(self):
+        """Test that a journaled Library change reaches the file at once and is synced within max_delay"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with Journal(tmp_dir, group_commit=64, max_delay=0.05) as journal:
+                library = journal.load(sink=NullSink())
+                library.add_book("LIB-001", "Journal Book", "Author One", "Fantasy", 2)
+
+                # Readable by a recovering process before any fsync
+                assert Journal(tmp_dir).load(sink=NullSink()).get_book_details("LIB-001") is not None
+                deadline = time.monotonic() + 5
+                while journal._unsynced and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                assert journal._unsynced == 0
+            assert not journal._flusher
+
+    def test_mapped_catalog_matches_books(self):
+        """Test that the memory-mapped catalog file answers like the Library"""
+        self.library.add_book("LIB-000", "Ünïcode Tïtle", "Author One", "Fantasy", 2)
+        self.library.borrow_book(self.member_id, "LIB-000")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "catalog.bin")
+            write_catalog(self.library.get_all_books(), path)
+
+            with MappedCatalog(path) as catalog:
+                assert len(catalog) == 3
+                assert list(catalog) == list(self.library.get_all_books())
+                assert dict(catalog.get_all_books().items()) == self.library.get_all_books()
+                assert catalog.get_book_details("LIB-000") == self.library.get_book_details("LIB-000")
+                assert catalog.get_book_details("LIB-999") is None
+                assert "LIB-002" in catalog
+
+    def test_records_keep_dict_style_access(self):
+        """Test that Library book and member records still behave like dicts"""
+        book = self.library.get_book_details("LIB-001")
+        assert book == {'title': "Test Book 1", 'author': "Author One", 'genre': "Science Fiction",
+                        'total_copies': 3, 'available_copies': 3}
+        assert book['title'] == book.title
+        assert book.get('isbn') is None
+
+        member = self.library.get_member_details(self.member_id)
+        assert dict(member) == {'member_id': self.member_id, 'name': "Test Member",
+                                'email': "test@email.com", 'borrowed_books': []}
+        # Writes would bypass the indexes, so they go through update_member()
+        try:
+            member['email'] = "other@email.com"
+            assert False, "Record fields should be read-only"
+        except TypeError:
+            pass
+        assert self.library.add_member("Other Member", "other@email.com")
+        assert self.library.add_member("Test Copy", "test@email.com") == False
+
+    def test_concurrent_borrow_return_keeps_invariants(self):
+        """Test thousands of parallel borrows and returns against low-stock Library books"""
+        library = LibraryManagementSystem(sink=NullSink(), concurrent=True)
+        isbns = [f"LIB-{number:03d}" for number in range(10)]
+        for isbn in isbns:
+            library.add_book(isbn, f"Scarce {isbn}", "Author", "Fantasy", 2)
+        for number in range(40):
+            library.add_member(f"Member {number}", f"member{number}@email.com")
+        member_ids = [member['member_id'] for member in library.get_all_members()]
+
+        # Yield to other threads between the availability check and the update
+        lend_book = library._lend_book
+
+        def slow_lend_book(member_id, isbn):
+            time.sleep(0)
+            lend_book(member_id, isbn)
+
+        library._lend_book = slow_lend_book
+
+        def desk(seed):
+            rng = random.Random(seed)
+            for _ in range(500):
+                member_id, isbn = rng.choice(member_ids), rng.choice(isbns)
+                if rng.random() < 0.6:
+                    library.borrow_book(member_id, isbn)
+                else:
+                    library.return_book(member_id, isbn)
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=desk, args=(seed,)) for seed in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        for isbn in isbns:
+            book = library.get_book_details(isbn)
+            holders = sum(isbn in member['borrowed_books'] for member in library.get_all_members())
+            assert 0 <= book['available_copies'] <= book['total_copies']
+            assert book['total_copies'] - book['available_copies'] == holders
+        for member in library.get_all_members():
+            assert len(member['borrowed_books']) <= 3
+            assert len(set(member['borrowed_books'])) == len(member['borrowed_books'])
+
+    def test_concurrent_searches_and_listings_survive_catalog_changes(self):
+        """Test Library searches and listings on threads while another thread adds and deletes books"""
+        library = LibraryManagementSystem(sink=NullSink(), concurrent=True, search_cache_size=0)
+        for number in range(200):
+            library.add_book(f"B{number:04d}", f"Storm {number}", "Author", "Fantasy", 1)
+        errors = []
+        stop = threading.Event()
+
+        def churn():
+            try:
+                for number in range(200, 1200):
+                    library.add_book(f"B{number:04d}", f"Storm {number}", "Author", "Fantasy", 1)
+                    library.delete_book(f"B{number - 100:04d}")
+            except Exception as e:
+                errors.append(e)
+            finally:
+                stop.set()
+
+        def reader(seed):
+            rng = random.Random(seed)
+            try:
+                while not stop.is_set():
+                    term = rng.choice(["st", "storm 1", "o"])
+                    assert library.search_books("title", term)[0]
+                    library.page_search("title", term, limit=5)
+                    library.fuzzy_search_books("title", "strom", limit=3)
+                    page, cursor = library.page_books(limit=5, sort_key="title")
+                    list(library.iter_books(cursor, limit=20, sort_key="title"))
+            except Exception as e:
+                errors.append(e)
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=reader, args=(seed,)) for seed in range(3)]
+            threads.append(threading.Thread(target=churn))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        assert errors == []
+        assert len(library.books) == 200
+
+    def test_service_answers_pipelined_requests(self):
+        """Test the Library JSON-lines service with pipelined client requests"""
+        self.library.sink = NullSink()
+
+        async def scenario():
+            service = await LibraryService(self.library, port=0).start()
+            client = await LibraryClient.connect(port=service.port)
+            try:
+                borrowed = client.send('borrow_book', self.member_id, "LIB-001")
+                searched = client.send('search_books', "author", "author two")
+                details = client.send('get_book_details', "LIB-001")
+                unknown = client.send('run_interactive')
+                assert await borrowed == True
+                assert await searched == [True, [["LIB-002", dict(self.library.get_book_details("LIB-002"))]]]
+                assert (await details)['available_copies'] == 2
+                try:
+                    await unknown
+                    assert False, "unknown operation should fail"
+                except RuntimeError as e:
+                    assert "Unknown operation" in str(e)
+                assert await client.call('return_book', self.member_id, "LIB-001") == True
+            finally:
+                await client.close()
+                await service.close()
+
+        asyncio.run(scenario())
+        assert self.library.get_book_details("LIB-001")['available_copies'] == 3
+
+    def test_parallel_search_matches_in_process_search(self):
+        """Test that sharded Library search returns the in-process results"""
+        self.library.sink = NullSink()
+        self.library.add_book("LIB-003", "Third Test Book", "Author Three", "Thriller", 1)
+        expected = {term: self.library.search_books("title", term) for term in ["book", "third", "te"]}
+
+        self.library.enable_parallel_search(workers=2, threshold=0)
+        try:
+            for term, result in expected.items():
+                assert self.library.search_books("title", term) == result
+
+            self.library.update_book("LIB-001", "author", "Renamed Author")
+            self.library.delete_book("LIB-002")
+            self.library.add_book("LIB-004", "Fourth", "Renamed Too", "Fantasy", 1)
+            success, results = self.library.search_books("author", "renamed")
+            assert [isbn for isbn, book in results] == ["LIB-001", "LIB-004"]
+            assert self.library.search_books("author", "author two") == (True, [])
+        finally:
+            self.library.disable_parallel_search()
+
+    def test_benchmarks_report_and_flag_slowdowns(self):
+        """Test that the Library benchmark suite reports results and flags slowdowns"""
+        output = io.StringIO()
+        with redirect_stdout(output):
+            report = run_benchmarks(["10k"], selected=["borrow_book", "return_book"], repeat=1)
+            results = report['results']['10k']
+            assert sorted(results) == ["borrow_book", "return_book"]
+            assert results['borrow_book']['operations'] == 1000
+
+            slower = {'results': {'10k': {name: dict(result, us_per_op=result['us_per_op'] * 2)
+                                          for name, result in results.items()}}}
+            assert len(compare(report, slower, threshold=0.25)) == 2
+            assert compare(report, report, threshold=0.25) == []
+
+    def test_metrics_count_calls_errors_and_latency(self):
+        """Test Library per-operation metrics and their Prometheus export"""
+        self.library.sink = NullSink()
+        metrics = self.library.enable_metrics()
+        self.library.borrow_book(self.member_id, "LIB-001")
+        self.library.borrow_book(self.member_id, "LIB-404")
+        self.library.search_books("title", "")
+
+        exported = metrics.as_dict()
+        assert exported['borrow_book']['calls'] == 2
+        assert exported['borrow_book']['errors'] == 1
+        assert exported['borrow_book']['buckets'][float('inf')] == 2
+        assert exported['search_books']['errors'] == 1
+
+        text = metrics.to_prometheus()
+        assert 'library_operation_calls_total{operation="borrow_book"} 2' in text
+        assert 'library_operation_duration_seconds_count{operation="search_books"} 1' in text
+
+        self.library.disable_metrics()
+        self.library.borrow_book(self.member_id, "LIB-002")
+        assert metrics.as_dict()['borrow_book']['calls'] == 2
+        assert "borrow_book" not in vars(self.library)
+
+    def test_profile_reports_hot_spots(self):
+        """Test that the Library profiling hook prints the profiled calls"""
+        self.library.sink = NullSink()
+        report = io.StringIO()
+        with self.library.profile(top=5, stream=report):
+            self.library.search_books("title", "test")
+        assert "search_books" in report.getvalue()
+
+    def test_search_cache_hits_and_invalidates_precisely(self):
+        """Test the Library search cache counters and invalidation on catalog changes"""
+        self.library.search_books("title", "Test Book")
+        self.library.search_books("title", "test book")
+        self.library.search_books("author", "author two")
+        stats = self.library.search_cache_stats()
+        assert (stats['hits'], stats['misses'], stats['size']) == (1, 2, 2)
+
+        # Genre and copy changes keep cached entries; a matching title change drops one
+        self.library.update_book("LIB-001", "genre", "Thriller")
+        self.library.update_book("LIB-002", "title", "Other Name")
+        stats = self.library.search_cache_stats()
+        assert (stats['invalidations'], stats['size']) == (1, 1)
+
+        success, results = self.library.search_books("title", "test book")
+        assert [isbn for isbn, book in results] == ["LIB-001"]
+
+        self.library.add_book("LIB-003", "Test Book 3", "Author Three", "Fantasy", 1)
+        success, results = self.library.search_books("title", "test book")
+        assert [isbn for isbn, book in results] == ["LIB-001", "LIB-003"]
+
+        results.clear()
+        success, results = self.library.search_books("title", "test book")
+        assert len(results) == 2
+
+        self.library.delete_book("LIB-003")
+        success, results = self.library.search_books("title", "test book")
+        assert [isbn for isbn, book in results] == ["LIB-001"]
+
+    def test_search_cache_evicts_least_recently_used(self):
+        """Test that the Library search cache stays within its size"""
+        library = LibraryManagementSystem(sink=NullSink(), search_cache_size=2)
+        library.add_book("LIB-001", "Alpha", "Author", "Fantasy", 1)
+        for term in ["alpha", "alp", "lph", "alpha"]:
+            library.search_books("title", term)
+        stats = library.search_cache_stats()
+        assert (stats['evictions'], stats['size'], stats['hits']) == (2, 2, 0)
+
+    def test_pages_resume_from_cursor_after_changes(self):
+        """Test that Library pages continue where they left off"""
+        for number in range(4, 8):
+            self.library.add_book(f"LIB-00{number}", f"Book {8 - number}", "Author", "Fantasy", 1)
+        books, cursor = self.library.page_books(limit=2, sort_key="title")
+        assert [isbn for isbn, book in books] == ["LIB-007", "LIB-006"]
+
+        self.library.delete_book("LIB-005")
+        self.library.add_book("LIB-000", "Book 0", "Author", "Fantasy", 1)
+        books, cursor = self.library.page_books(cursor, limit=2, sort_key="title")
+        assert [isbn for isbn, book in books] == ["LIB-004", "LIB-001"]
+        books, cursor = self.library.page_books(cursor, limit=2, sort_key="title")
+        assert [isbn for isbn, book in books] == ["LIB-002"] and cursor is None
+
+        assert [isbn for isbn, book in self.library.iter_books(offset=1, limit=2)] == ["LIB-002", "LIB-004"]
+        self.library.add_member("Another Member", "another@email.com")
+        members = [member.member_id for member in self.library.iter_members(sort_key="name")]
+        assert members == ["MEM002", "MEM001"]
+
+    def test_page_search_matches_search_books(self):
+        """Test that paged Library search returns the same books as search_books"""
+        for number in range(10, 35):
+            self.library.add_book(f"LIB-{number}", f"Test Book {number}", "Author", "Fantasy", 1)
+        success, results = self.library.search_books("title", "test")
+        paged = []
+        success, page, cursor = self.library.page_search("title", "test", limit=7)
+        paged.extend(page)
+        while cursor is not None:
+            success, page, cursor = self.library.page_search("title", "test", list(cursor), limit=7)
+            paged.extend(page)
+        assert paged == results
+        assert self.library.page_search("genre", "test") == (False, [], None)
+
+    def test_display_all_books_pages_output(self):
+        """Test that the Library listing stops after the first page when asked"""
+        for number in range(10, 60):
+            self.library.add_book(f"LIB-{number}", f"Test Book {number}", "Author", "Fantasy", 1)
+        output = io.StringIO()
+        prompts = []
+        original_input = builtins.input
+        builtins.input = lambda prompt: prompts.append(prompt) or "q"
+        try:
+            with redirect_stdout(output):
+                self.library._display_all_books()
+        finally:
+            builtins.input = original_input
+        assert output.getvalue().count("ISBN:") == self.library.page_size
+        assert len(prompts) == 1
+
+    def test_listing_writes_pages_and_saves_the_rest(self):
+        """Test that the Library listing writes one block per page and can save the rest to a file"""
+        for number in range(10, 60):
+            self.library.add_book(f"LIB-{number}", f"Test Book {number}", "Author", "Fantasy", 1)
+
+        class CountingStream(io.StringIO):
+            writes = 0
+
+            def write(self, text):
+                CountingStream.writes += 1
+                return super().write(text)
+
+        stream = CountingStream()
+        self.library.renderer = Renderer(stream)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "books.txt")
+            original_input = builtins.input
+            builtins.input = lambda prompt: f"w {path}"
+            try:
+                with redirect_stdout(io.StringIO()):
+                    self.library._display_all_books()
+            finally:
+                builtins.input = original_input
+            with open(path, encoding="utf-8") as f:
+                saved = f.read()
+
+        assert CountingStream.writes == 1
+        assert stream.getvalue().count("ISBN:") == self.library.page_size
+        assert saved.count("ISBN:") == 52 - self.library.page_size
+        assert saved.startswith("📖 Test Book 28 by Author\n   ISBN: LIB-28\n")
+
+        # Search results go through the renderer too, nothing straight to stdout
+        self.library.sink = NullSink()
+        stream = io.StringIO()
+        self.library.renderer = Renderer(stream)
+        answers = iter(["title", "test book 5", "q"])
+        builtins.input = lambda prompt: next(answers)
+        output = io.StringIO()
+        try:
+            with redirect_stdout(output):
+                self.library._interactive_search_books()
+        finally:
+            builtins.input = original_input
+        assert output.getvalue() == ""
+        assert stream.getvalue().startswith("\n") and stream.getvalue().count("ISBN:") == 10
+
+        renderer = Renderer(size_ttl=60)
+        assert renderer.terminal_size() is renderer.terminal_size()
+
+    def test_borrow_many_is_all_or_nothing(self):
+        """Test that a failing Library batch borrow changes nothing"""
+        self.library.add_book("LIB-003", "Test Book 3", "Author Three", "Thriller", 1)
+        assert self.library.borrow_many(self.member_id, ["LIB-001", "LIB-002", "LIB-404"]) is False
+        assert self.library.get_member_details(self.member_id)['borrowed_books'] == []
+        assert self.library.get_book_details("LIB-002")['available_copies'] == 1
+
+        assert self.library.borrow_many(self.member_id, ["LIB-001", "LIB-002", "LIB-003"]) is True
+        assert self.library.get_book_details("LIB-001")['available_copies'] == 2
+        assert self.library.borrow_many(self.member_id, ["LIB-001"]) is False
+
+        assert self.library.return_many(self.member_id, ["LIB-001", "LIB-001"]) is False
+        assert self.library.return_many(self.member_id, ["LIB-001", "LIB-003"]) is True
+        assert self.library.get_member_details(self.member_id)['borrowed_books'] == ["LIB-002"]
+
+    def test_execute_batch_checks_entries_in_order(self):
+        """Test that a Library batch sees the effect of its earlier entries"""
+        self.library.add_member("Second Member", "second@email.com")
+        events = []
+        self.library.add_mutation_listener(lambda op, record: events.append(op))
+        swap = [("return_book", self.member_id, "LIB-002"), ("borrow_book", "MEM002", "LIB-002")]
+        assert self.library.execute_batch(swap) is False
+
+        self.library.borrow_book(self.member_id, "LIB-002")
+        assert self.library.execute_batch(swap) is True
+        assert self.library.get_member_details("MEM002")['borrowed_books'] == ["LIB-002"]
+        assert events == ["borrow_book", "return_book", "borrow_book"]
+        assert self.library.execute_batch([("delete_book", self.member_id, "LIB-001")]) is False
+
+    def test_genre_index_tracks_every_change(self):
+        """Test that Library genre listings and counts follow each operation"""
+        self.library.add_book("LIB-003", "Test Book 3", "Author Three", "Fantasy", 2)
+        self.library.borrow_many(self.member_id, ["LIB-002", "LIB-003"])
+        self.library.update_book("LIB-001", "genre", "Fantasy")
+        self.library.update_book("LIB-003", "total_copies", 4)
+        self.library.return_book(self.member_id, "LIB-002")
+        self.library.delete_book("LIB-002")
+
+        assert [isbn for isbn, book in self.library.books_by_genre("Fantasy")] == ["LIB-003", "LIB-001"]
+        assert self.library.books_by_genre("Thriller") == []
+        stats = self.library.genre_stats()
+        assert stats["Fantasy"] == {'titles': 2, 'total_copies': 7, 'available_copies': 6}
+        assert stats["Science Fiction"] == {'titles': 0, 'total_copies': 0, 'available_copies': 0}
+
+        expected = {}
+        for book in self.library.get_all_books().values():
+            counts = expected.setdefault(book['genre'], [0, 0, 0])
+            counts[0] += 1
+            counts[1] += book['total_copies']
+            counts[2] += book['available_copies']
+        restored = LibraryManagementSystem.from_state(self.library.export_state(), sink=NullSink())
+        for genre, counts in restored.genre_stats().items():
+            assert list(counts.values()) == expected.get(genre, [0, 0, 0])
+
+    def test_borrower_index_answers_loan_queries(self):
+        """Test that Library loan queries follow borrows and returns"""
+        self.library.add_member("Second Member", "second@email.com")
+        self.library.borrow_book("MEM002", "LIB-001")
+        self.library.borrow_many(self.member_id, ["LIB-002", "LIB-001"])
+        assert [member['member_id'] for member in self.library.current_borrowers("LIB-001")] == ["MEM002", self.member_id]
+        assert [member['member_id'] for member in self.library.members_with_loans()] == ["MEM002", self.member_id]
+
+        borrowed = self.library.get_member_details(self.member_id)['borrowed_books']
+        assert borrowed == ["LIB-002", "LIB-001"] and borrowed[-1] == "LIB-001"
+        assert borrowed == {"LIB-001", "LIB-002"} and json.dumps(list(borrowed))
+
+        self.library.return_book("MEM002", "LIB-001")
+        assert self.library.current_borrowers("LIB-001")[0]['member_id'] == self.member_id
+        assert [member['member_id'] for member in self.library.members_with_loans()] == [self.member_id]
+        assert self.library.current_borrowers("LIB-404") == []
+        assert self.library.check_loans() == []
+
+        restored = LibraryManagementSystem.from_state(self.library.export_state(), sink=NullSink())
+        assert restored.check_loans() == []
+        # Corrupt the record behind the library's back
+        restored.get_book_details("LIB-002").available_copies = 1
+        assert len(restored.check_loans()) == 1
+
+    def test_fuzzy_search_ranks_typos_first(self):
+        """Test that fuzzy Library search forgives typos and ranks the closest books"""
+        self.library.add_book("LIB-003", "The Hobbit", "J.R.R. Tolkien", "Fantasy", 1)
+        self.library.add_book("LIB-004", "The Silmarillion", "Christopher Tolkien", "Fantasy", 1)
+        self.library.add_book("LIB-005", "The Hobbit Companion", "David Day", "Non-Fiction", 1)
+        assert self.library.search_books("author", "tolkein") == (True, [])
+
+        success, results = self.library.fuzzy_search_books("author", "tolkein")
+        assert success and [isbn for isbn, book, score in results] == ["LIB-003", "LIB-004"]
+        success, results = self.library.fuzzy_search_books("title", "the hobit", limit=2)
+        assert [isbn for isbn, book, score in results] == ["LIB-003", "LIB-005"]
+        assert results[0][2] > results[1][2]
+
+        all_titles = self.library.fuzzy_search_books("title", "book", limit=10, min_score=0.0)[1]
+        assert [isbn for isbn, book, score in all_titles] == ["LIB-001", "LIB-002"]
+        assert self.library.fuzzy_search_books("title", "xyzzy") == (True, [])
+        assert self.library.fuzzy_search_books("genre", "tolkein") == (False, [])
+
+        # Equal scores: the earliest books in the catalog make the cut
+        for number in range(50):
+            self.library.add_book(f"S-{(number * 37) % 50:02d}", f"Storm {number + 10}", "Author", "Thriller", 1)
+        ties = self.library.fuzzy_search_books("title", "storm", limit=3)[1]
+        assert [isbn for isbn, book, score in ties] == ["S-00", "S-37", "S-24"]
+        assert len({score for isbn, book, score in ties}) == 1
+
+        # Past the candidate budget only the earliest books are scored
+        self.library.add_book("S-99", "Storm", "Author", "Thriller", 1)
+        assert self.library.fuzzy_search_books("title", "storm", limit=1)[1][0][0] == "S-99"
+        capped = self.library._title_index.similar("storm", 3, 0.1, self.library._book_order, max_candidates=5)
+        assert [isbn for score, isbn in capped] == ["S-00", "S-37", "S-24"]
+
+    def test_suggest_completes_prefixes_after_changes(self):
+        """Test that Library autocomplete follows adds, updates and deletes"""
+        self.library.add_book("LIB-003", "The Hobbit", "J.R.R. Tolkien", "Fantasy", 1)
+        self.library.add_book("LIB-004", "The Hobbit", "J.R.R. Tolkien", "Fantasy", 1)
+        self.library.add_book("LIB-005", "The Help", "Kathryn Stockett", "Classic Literature", 1)
+        assert self.library.suggest("the h") == ["The Help", "The Hobbit"]
+        assert self.library.suggest("TEST", limit=1) == ["Test Book 1"]
+        assert self.library.suggest("j.r", field="author") == ["J.R.R. Tolkien"]
+
+        self.library.delete_book("LIB-003")
+        assert self.library.suggest("the hob") == ["The Hobbit"]
+        self.library.update_book("LIB-004", "title", "There and Back Again")
+        assert self.library.suggest("the") == ["The Help", "There and Back Again"]
+        assert self.library.suggest("") == []
+
+        library = LibraryManagementSystem(sink=NullSink())
+        library.import_books({'isbn': f"LIB-{number}", 'title': f"Title {number:04d}", 'author': "Author",
+                              'genre': "Fantasy", 'total_copies': 1} for number in range(1000))
+        for number in range(0, 1000, 2):
+            library.delete_book(f"LIB-{number}")
+        assert library.suggest("title 09", limit=3) == ["Title 0901", "Title 0903", "Title 0905"]
+
+    def test_query_books_combines_predicates_with_a_plan(self):
+        """Test that Library queries filter, sort and explain their plan"""
+        self.library.add_book("LIB-003", "The Hobbit", "J.R.R. Tolkien", "Fantasy", 2)
+        self.library.add_book("LIB-004", "Dune", "Frank Herbert", "Science Fiction", 4)
+        self.library.borrow_book(self.member_id, "LIB-002")
+
+        where = ("and", ("genre", "in", ["Fantasy", "Science Fiction"]), ("available", "==", True))
+        success, results = self.library.query_books(where, sort_by="total_copies", descending=True, limit=2)
+        assert success and [isbn for isbn, book in results] == ["LIB-004", "LIB-001"]
+        assert "genre index" in self.library.explain_query(where)
+
+        where = ("or", ("title", "contains", "HOBBIT"), ("author", "prefix", "frank"))
+        success, results = self.library.query_books(where)
+        assert [isbn for isbn, book in results] == ["LIB-003", "LIB-004"]
+        assert "union of title trigram index, author trigram index" in self.library.explain_query(where)
+
+        where = ("and", ("total_copies", ">=", 2), ("available_copies", "<", 3))
+        success, results = self.library.query_books(where, sort_by="title")
+        assert [isbn for isbn, book in results] == ["LIB-003"]
+        assert self.library.explain_query(where, limit=1).startswith("access: full scan")
+
+        assert self.library.query_books(("title", "like", "x")) == (False, [])
+        assert self.library.query_books(("pages", ">", 1)) == (False, [])
+        assert self.library.query_books(("and",)) == (False, [])
+
+    def test_batch_mode_runs_scripts_and_json_requests(self):
+        """Test that Library batch mode runs every command and reports each result"""
+        lines = [
+            "# checkout log",
+            'add_book LIB-003 "The Hobbit" "J.R.R. Tolkien" Fantasy 2',
+            f"borrow_many {self.member_id} LIB-001,LIB-003",
+            "",
+            f"borrow_book {self.member_id} LIB-404",
+            '{"id": 7, "op": "search_books", "args": ["title", "hobbit"]}',
+            "export_state",
+        ]
+        output = io.StringIO()
+        summary = io.StringIO()
+        report = run_batch(self.library, lines, output, summary)
+
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [result['line'] for result in results] == [2, 3, 5, 6, 7]
+        assert [result['ok'] for result in results] == [True, True, False, True, False]
+        assert results[2]['error'] == "Book with ISBN 'LIB-404' not found!"
+        assert results[3]['id'] == 7 and results[3]['result'][1][0][0] == "LIB-003"
+        assert results[4]['error'] == "Unknown operation: export_state"
+        assert self.library.get_book_details("LIB-003")['available_copies'] == 1
+        assert (report['commands'], report['succeeded'], report['failed']) == (5, 3, 2)
+        assert "5 command(s): 3 succeeded, 2 failed" in summary.getvalue()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "day.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('add_member "Batch Member" batch@email.com\nborrow_book MEM001 LIB-001\n')
+            output = io.StringIO()
+            with redirect_stdout(output), redirect_stderr(io.StringIO()):
+                assert operations.main(["--batch", path]) == 1
+        assert [json.loads(line)['ok'] for line in output.getvalue().splitlines()] == [True, False]
+
+    def test_change_feed_numbers_events_and_resumes(self):
+        """Test that the Library change feed emits ordered typed events and resumes from a seq"""
+        from changefeed import ResumeError
+
+        feed = self.library.enable_change_feed(capacity=4)
+        subscription = feed.subscribe()
+        self.library.add_book("LIB-003", "The Hobbit", "J.R.R. Tolkien", "Fantasy", 1)
+        self.library.borrow_book(self.member_id, "LIB-003")
+        self.library.borrow_book(self.member_id, "LIB-404")
+        self.library.return_book(self.member_id, "LIB-003")
+
+        events = subscription.poll()
+        assert [event['seq'] for event in events] == [1, 2, 3]
+        assert [event['type'] for event in events] == ['book_added', 'book_borrowed', 'book_returned']
+        assert events[1]['record'] == {'member_id': self.member_id, 'isbn': "LIB-003"}
+        assert [event['seq'] for event in self.library.read_changes(after_seq=1)] == [2, 3]
+        assert subscription.poll() == []
+
+        for copies in range(2, 6):
+            self.library.update_book("LIB-003", "total_copies", copies)
+        assert [event['type'] for event in subscription.poll(limit=2)] == ['book_updated'] * 2
+        try:
+            self.library.read_changes(after_seq=1)
+            assert False, "Events 2 and 3 should have been overwritten"
+        except ResumeError:
+            pass
+
+        for copies in range(6, 10):
+            self.library.update_book("LIB-003", "total_copies", copies)
+        try:
+            subscription.poll()
+            assert False, "The subscriber should have fallen behind"
+        except ResumeError:
+            pass
+
+        self.library.disable_change_feed()
+        self.library.delete_book("LIB-002")
+        assert feed.last_seq == 11
+        try:
+            self.library.read_changes()
+            assert False, "The feed should be disabled"
+        except ValueError:
+            pass
+
+    def test_change_feed_continues_the_journal_numbering(self):
+        """Test that a journaled Library change feed keeps its sequence numbers across restarts"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with Journal(tmp_dir) as journal:
+                library = journal.load(sink=NullSink())
+                feed = library.enable_change_feed()
+                library.add_book("LIB-001", "Journal Book", "Author One", "Fantasy", 2)
+                library.add_member("Journal Member", "journal@email.com")
+                saved_seq = feed.read()[-1]['seq']
+                assert saved_seq == 2
+
+            with Journal(tmp_dir) as journal:
+                library = journal.load(sink=NullSink(), lazy=True)
+                feed = library.enable_change_feed()
+                assert feed.last_seq == saved_seq
+                library.borrow_book("MEM001", "LIB-001")
+                events = library.read_changes(after_seq=saved_seq)
+                assert [(event['seq'], event['op']) for event in events] == [(3, 'borrow_book')]
+
+        # An explicit start wins; without a journal numbering starts at 0
+        assert self.library.enable_change_feed(start_seq=41).last_seq == 41
+        self.library.delete_book("LIB-002")
+        assert self.library.read_changes(after_seq=41)[0]['seq'] == 42
+        assert self.library.enable_change_feed().last_seq == 0
+
+    def test_lazy_load_waits_only_for_the_needed_stage(self):
+        """Test that a lazily loaded Library opens at once and gates operations until loaded"""
+        self.library.borrow_book(self.member_id, "LIB-001")
+        state = self.library.export_state()
+        release_search = threading.Event()
+        build_index = operations._NgramIndex.extend
+
+        def slow_build(index, items):
+            # Holds the search stage back until the test is ready
+            release_search.wait(5)
+            build_index(index, items)
+
+        operations._NgramIndex.extend = slow_build
+        try:
+            library = LibraryManagementSystem.from_loader(lambda library: library.restore_state(state),
+                                                          NullSink(), lazy=True)
+            assert library.loading
+            assert library.wait_until_loaded("records", timeout=5)
+            assert library.get_book_details("LIB-001")['available_copies'] == 2
+            assert library.return_book(self.member_id, "LIB-001") == True
+
+            searches = []
+            searcher = threading.Thread(target=lambda: searches.append(library.search_books("title", "book 2")))
+            searcher.start()
+            searcher.join(0.05)
+            assert searcher.is_alive() and not library.wait_until_loaded(timeout=0.01)
+        finally:
+            release_search.set()
+            operations._NgramIndex.extend = build_index
+        searcher.join(5)
+        assert [isbn for isbn, book in searches[0][1]] == ["LIB-002"]
+        assert not library.loading and "search_books" not in library.__dict__
+        assert library.suggest("test") == ["Test Book 1", "Test Book 2"]
+
+        def broken(library):
+            raise OSError("disk unplugged")
+
+        failed = LibraryManagementSystem.from_loader(broken, NullSink(), lazy=True)
+        try:
+            failed.get_book_details("LIB-001")
+            assert False, "A failed load should be reported"
+        except RuntimeError as e:
+            assert "disk unplugged" in str(e)
+
+    def test_journal_loads_lazily(self):
+        """Test that a journaled Library can be reopened lazily and keeps journaling"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with Journal(tmp_dir, snapshot_every=2) as journal:
+                library = journal.load(sink=NullSink())
+                library.add_book("LIB-001", "Journal Book", "Author One", "Fantasy", 2)
+                library.add_member("Journal Member", "journal@email.com")
+                library.borrow_book("MEM001", "LIB-001")
+                expected = library.export_state()
+
+            with Journal(tmp_dir) as journal:
+                library = journal.load(sink=NullSink(), lazy=True)
+                assert library.export_state() == expected
+                assert library.search_books("title", "journal")[1][0][0] == "LIB-001"
+                library.return_book("MEM001", "LIB-001")
+                expected = library.export_state()
+
+            assert Journal(tmp_dir).load(sink=NullSink()).export_state() == expected
+
+            # Closing before a slow lazy load finishes waits for its records
+            journal = Journal(tmp_dir)
+            restore = journal._restore
+
+            def slow_restore(library):
+                time.sleep(0.2)
+                restore(library)
+
+            journal._restore = slow_restore
+            library = journal.load(sink=NullSink(), lazy=True)
+            journal.close()
+            assert library.wait_until_loaded(timeout=5)
+            assert journal._segment is None and library._listeners == []
+
+    def test_change_feed_blocks_for_slow_subscribers(self):
+        """Test that a blocking Library change feed waits for subscribers to catch up"""
+        feed = self.library.enable_change_feed(capacity=2, overflow="block", block_timeout=5)
+        subscription = feed.subscribe()
+        received = []
+
+        def consume():
+            while len(received) < 6:
+                received.extend(subscription.poll(timeout=5))
+                time.sleep(0.01)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for copies in range(2, 8):
+            self.library.update_book("LIB-001", "total_copies", copies)
+        consumer.join(timeout=10)
+        assert [event['seq'] for event in received] == [1, 2, 3, 4, 5, 6]
+        assert [event['record']['value'] for event in received] == [2, 3, 4, 5, 6, 7]
+
+        # A subscriber that never reads is dropped after block_timeout
+        feed.block_timeout = 0.05
+        subscription.close()
+        stalled = feed.subscribe()
+        for copies in range(3):
+            self.library.update_book("LIB-001", "total_copies", copies + 3)
+        assert feed.last_seq == 9 and stalled.overrun
+
+
+    def test_sqlite_backend_matches_memory_backend(self):
+        """Test that the SQLite Library backend returns what the in-memory Library returns"""
+        from service import to_json
+
+        operations_run = [
+            ("add_book", "LIB-001", "The Hobbit", "J.R.R. Tolkien", "Fantasy", 2),
+            ("add_book", "LIB-002", "Storm Crown", "Ann Leckie", "Fantasy", 1),
+            ("add_book", "LIB-003", "Dune", "Frank Herbert", "Science Fiction", 1),
+            ("add_book", "LIB-001", "Duplicate", "Nobody", "Fantasy", 1),
+            ("add_member", "Aminata Kamara", "aminata@email.com"),
+            ("add_member", "John Smith", "john@email.com"),
+            ("add_member", "Copy Cat", "aminata@email.com"),
+            ("borrow_book", "MEM001", "LIB-001"),
+            ("borrow_many", "MEM002", ["LIB-001", "LIB-002", "LIB-003"]),
+            ("borrow_book", "MEM001", "LIB-003"),
+            ("search_books", "title", "o"),
+            ("search_books", "author", "TOLK"),
+            ("update_book", "LIB-002", "genre", "Thriller"),
+            ("update_book", "LIB-001", "total_copies", "1"),
+            ("update_book", "LIB-003", "title", "Dune Messiah"),
+            ("search_books", "title", "messiah"),
+            ("update_member", "MEM001", "email", "john@email.com"),
+            ("return_book", "MEM002", "LIB-001"),
+            ("delete_book", "LIB-003"),
+            ("execute_batch", [("return_book", "MEM002", "LIB-003"), ("borrow_book", "MEM001", "LIB-002")]),
+            ("delete_member", "MEM003"),
+            ("genre_stats",),
+            ("books_by_genre", "Fantasy"),
+            ("current_borrowers", "LIB-002"),
+            ("members_with_loans",),
+            ("check_loans",),
+            ("page_books", None, 2, "title"),
+            ("page_books", ("storm crown", "LIB-002"), 2, "title"),
+            ("page_members", None, 1, "email"),
+            ("page_search", "title", "o", None, 1),
+            ("page_search", "title", "o", (0, "LIB-001")),
+            ("fuzzy_search_books", "title", "the hobit"),
+            ("fuzzy_search_books", "author", "tolkein", 5, 0.1),
+            ("suggest", "st", "title"),
+            ("suggest", "j", "author"),
+            ("query_books", ("and", ("genre", "==", "Fantasy"), ("available", "==", True)), "title"),
+            ("query_books", ("title", "contains", "o"), None, True, 1),
+            ("add_book", "LIB-004", "İstanbul Hatıraları", "Orhan Pamuk", "Non-Fiction", 1),
+            ("search_books", "title", "i̇st"),
+            ("fuzzy_search_books", "title", "istanbul"),
+            ("export_state",),
+        ]
+
+        def run(library):
+            return [to_json(getattr(library, op)(*args)) for op, *args in operations_run]
+
+        with open_library("sqlite", sink=NullSink()) as library:
+            assert run(library) == run(open_library("memory", sink=NullSink()))
+            assert library.search_books("title", "i̇st")[1][0][0] == "LIB-004"
+            # Without the in-memory indexes every query is a full scan
+            assert "full scan" in library.explain_query(("genre", "==", "Fantasy"))
+            try:
+                library.enable_parallel_search(2)
+                assert False, "Parallel search needs the in-memory catalog"
+            except NotImplementedError:
+                pass
+
+    def test_sqlite_backend_persists_and_rolls_back(self):
+        """Test that the SQLite Library backend keeps committed changes and undoes failed ones"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "library.sqlite3")
+            with SQLiteLibrary(path, NullSink(), commit_every=100) as library:
+                library.add_book("LIB-001", "The Hobbit", "J.R.R. Tolkien", "Fantasy", 2)
+                library.add_member("Aminata Kamara", "aminata@email.com")
+                assert library.borrow_book("MEM001", "LIB-001")
+                assert library.return_book("MEM001", "LIB-001")
+
+                # An operation that fails halfway leaves no trace
+                failing = library._link_loan
+                library._link_loan = lambda member, isbn: (failing(member, isbn), 1 / 0)
+                try:
+                    library.borrow_many("MEM001", ["LIB-001"])
+                    assert False, "The loan should have failed"
+                except ZeroDivisionError:
+                    pass
+                library._link_loan = failing
+                library.add_book("LIB-002", "Storm Crown", "Ann Leckie", "Fantasy", 1)
+
+            with SQLiteLibrary(path, NullSink()) as library:
+                assert library.get_book_details("LIB-001")['available_copies'] == 2
+                assert library.get_member_details("MEM001")['borrowed_books'] == []
+                assert list(library.get_all_books()) == ["LIB-001", "LIB-002"]
+                assert library.search_books("title", "storm")[1][0][0] == "LIB-002"
+                assert library.add_member("John Smith", "john@email.com")
+                assert library.get_all_members()[-1]['member_id'] == "MEM002"
+                assert library.check_loans() == []
+
+            output = io.StringIO()
+            with redirect_stdout(output):
+                report = run_benchmarks(["10k"], selected=["borrow_book", "fuzzy_search_title"], repeat=1,
+                                        backends=("sqlite",))
+            assert sorted(report['results']['10k/sqlite']) == ["borrow_book", "fuzzy_search_title"]
+            assert "skipped (not supported)" not in output.getvalue()
+
 
 def run_tests():
     """Run all tests and display results for Library Management System"""
@@ -204,6 +1298,51 @@ def run_tests():
         test_class.test_delete_book_with_borrowed_copies,
         test_class.test_delete_member_success,
         test_class.test_delete_member_with_borrowed_books,
+        test_class.test_update_member_email_reindexes,
+        test_class.test_delete_member_removes_lookup,
+        test_class.test_search_books_follows_updates_and_deletes,
+        test_class.test_search_books_matches_full_scan,
+        test_class.test_import_books_reports_bad_rows,
+        test_class.test_import_from_csv_and_jsonl_files,
+        test_class.test_null_sink_prints_nothing,
+        test_class.test_event_sink_records_structured_events,
+        test_class.test_buffered_sink_writes_on_flush,
+        test_class.test_journal_recovers_state,
+        test_class.test_journal_snapshot_compacts_and_ignores_torn_tail,
+        test_class.test_journal_snapshot_inside_a_batch_keeps_later_steps,
+        test_class.test_journal_snapshots_concurrent_library_consistently,
+        test_class.test_journal_orders_a_new_book_before_its_first_borrow,
+        test_class.test_journal_writes_records_and_syncs_when_idle,
+        test_class.test_mapped_catalog_matches_books,
+        test_class.test_records_keep_dict_style_access,
+        test_class.test_concurrent_borrow_return_keeps_invariants,
+        test_class.test_concurrent_searches_and_listings_survive_catalog_changes,
+        test_class.test_service_answers_pipelined_requests,
+        test_class.test_parallel_search_matches_in_process_search,
+        test_class.test_benchmarks_report_and_flag_slowdowns,
+        test_class.test_metrics_count_calls_errors_and_latency,
+        test_class.test_profile_reports_hot_spots,
+        test_class.test_search_cache_hits_and_invalidates_precisely,
+        test_class.test_search_cache_evicts_least_recently_used,
+        test_class.test_pages_resume_from_cursor_after_changes,
+        test_class.test_page_search_matches_search_books,
+        test_class.test_display_all_books_pages_output,
+        test_class.test_listing_writes_pages_and_saves_the_rest,
+        test_class.test_borrow_many_is_all_or_nothing,
+        test_class.test_execute_batch_checks_entries_in_order,
+        test_class.test_genre_index_tracks_every_change,
+        test_class.test_borrower_index_answers_loan_queries,
+        test_class.test_fuzzy_search_ranks_typos_first,
+        test_class.test_suggest_completes_prefixes_after_changes,
+        test_class.test_query_books_combines_predicates_with_a_plan,
+        test_class.test_batch_mode_runs_scripts_and_json_requests,
+        test_class.test_change_feed_numbers_events_and_resumes,
+        test_class.test_change_feed_continues_the_journal_numbering,
+        test_class.test_change_feed_blocks_for_slow_subscribers,
+        test_class.test_lazy_load_waits_only_for_the_needed_stage,
+        test_class.test_journal_loads_lazily,
+        test_class.test_sqlite_backend_matches_memory_backend,
+        test_class.test_sqlite_backend_persists_and_rolls_back,
     ]
 
     passed = 0